@@ -15,5 +15,5 @@ setup(	name='petit',
 	py_modules=['lib.crunchtools'],
 	data_files=[	('/var/lib/petit/fingerprints',glob.glob(os.path.join('lib','fingerprints','*.fp'))),
 			('petit/lib/fingerprint_library', glob.glob(os.path.join('lib','fingerprint_library','*.fp'))),
-			('/var/lib/petit/filters', glob.glob(os.path.join('lib','filters','*.stopwords')))]
+			('/var/lib/petit/filters', glob.glob(os.path.join('lib','filters','*.stopwords')) + glob.glob(os.path.join('lib','filters','*.rules')))]
 )
@@ -42,6 +42,7 @@ install src/lib/filters/daemon.stopwords ${RPM_BUILD_ROOT}/var/lib/petit/filters
 install src/lib/filters/host.stopwords ${RPM_BUILD_ROOT}/var/lib/petit/filters/host.stopwords
 install src/lib/filters/hash.stopwords ${RPM_BUILD_ROOT}/var/lib/petit/filters/hash.stopwords
 install src/lib/filters/words.stopwords ${RPM_BUILD_ROOT}/var/lib/petit/filters/words.stopwords
+install src/lib/filters/secure.rules ${RPM_BUILD_ROOT}/var/lib/petit/filters/secure.rules
 
 # Fingerprints
 install -d ${RPM_BUILD_ROOT}/var/lib/petit/fingerprints
@@ -19,6 +19,7 @@ cp -vf ./src/man/petit.1.gz /usr/share/man/man1/petit.1.gz
 # Filters
 mkdir -p /var/lib/petit/filters
 cp -vf ./src/lib/filters/*.stopwords /var/lib/petit/filters/
+cp -vf ./src/lib/filters/*.rules /var/lib/petit/filters/
 
 # Fingerprints
 mkdir -p /var/lib/petit/fingerprints
@@ -3,21 +3,258 @@ Generic log class which contains a payload of objects which conform to the
 LogEntry specification.  Log, which is a List (array) of type LogEntry,  is
 relied upon and consumed to build any of the XHash objects such as SuperHash
 or GraphHash.
+
+A Log can also be opened in streaming mode, in which case only a bounded
+sample from the head of the file is held in memory and entries are generated
+one at a time as the Log is iterated. Files on disk can also be memory
+mapped, which lets samples refer back to their line in the mapping by
+offset. Compressed files
+and compressed standard input are decompressed on the fly. Several logs,
+such as a rotation set, can be streamed together in time stamp order.
 """
 
 from collections import UserList
+from itertools import chain
+from itertools import islice
+from zlib import crc32
 
+import io
+import os
+import heapq
 import re
 import sys
+import bz2
+import gzip
+import lzma
+import mmap
+import queue
+import locale
 import logging
-from random import choice
 import datetime
+import threading
 import time
 import types
+
+# Zstandard is only supported when a binding is installed
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 #import rpdb2; rpdb2.start_embedded_debugger("password")
 
 
+# Month names and abbreviations understood by the time stamp decoders
+months = dict([(name.lower(), number) for number, names in enumerate([
+    (), ("Jan", "January"), ("Feb", "February"), ("Mar", "March"),
+    ("Apr", "April"), ("May",), ("Jun", "June"), ("Jul", "July"),
+    ("Aug", "August"), ("Sep", "September"), ("Oct", "October"),
+    ("Nov", "November"), ("Dec", "December")]) for name in names])
+
+# Time stamp caches are cleared when they grow beyond this many entries
+stamp_cache_size = 4096
+stamp_fields_cache = {}
+
+
+def month_number(name):
+    """Converts a month name or abbreviation to its number"""
+
+    try:
+        return months[name.lower()]
+    except KeyError:
+        raise ValueError("Unknown month: " + name)
+
+
+def epoch(year, month, day, hour, minute, second):
+    """
+    Converts wall clock time to seconds since 1970-01-01. No time zone is
+    applied, the time stamp is only used to order and bucket entries.
+    """
+
+    # Days from the civil calendar with March as the first month
+    year = year - (month <= 2)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (9 if month <= 2 else -3)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 \
+                 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+
+    return days * 86400 + hour * 3600 + minute * 60 + second
+
+
+def stamp_fields(timestamp):
+    """
+    Converts seconds since 1970-01-01 back to normalized year, month, day,
+    hour, minute and second strings
+    """
+
+    fields = stamp_fields_cache.get(timestamp)
+    if fields is not None:
+        return fields
+
+    days, seconds = divmod(timestamp, 86400)
+
+    # Civil calendar from days with March as the first month
+    days = days + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 \
+                   - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 \
+                                - year_of_era // 100)
+    month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month + 2) // 5 + 1
+    month = month + (3 if month < 10 else -9)
+    year = year_of_era + era * 400 + (month <= 2)
+
+    fields = ("%.4d" % year, "%.2d" % month, "%.2d" % day,
+              "%.2d" % (seconds // 3600), "%.2d" % (seconds // 60 % 60),
+              "%.2d" % (seconds % 60))
+
+    if len(stamp_fields_cache) >= stamp_cache_size:
+        stamp_fields_cache.clear()
+    stamp_fields_cache[timestamp] = fields
+
+    return fields
+
+
+def cache_path(name):
+    """Returns the path of a file in the per user petit cache directory"""
+
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "petit", name)
+
+
+# Magic bytes at the start of each supported compressed format
+signatures = [("gzip", b"\x1f\x8b"),
+              ("bzip2", b"BZh"),
+              ("xz", b"\xfd7zXZ\x00"),
+              ("zstd", b"\x28\xb5\x2f\xfd")]
+
+
+def compression(f):
+    """
+    Returns the compression format of a buffered binary file judged by its
+    magic bytes, or None. The bytes are peeked, not consumed.
+    """
+
+    if not hasattr(f, "peek"):
+        return None
+
+    magic = f.peek(6)[:6]
+    for name, signature in signatures:
+        if magic.startswith(signature):
+            return name
+
+    return None
+
+
+def compressed(filename):
+    """Determines if a file on disk is compressed"""
+
+    f = open(filename, "rb")
+    method = compression(f)
+    f.close()
+
+    return method is not None
+
+
+def open_binary(filename):
+    """
+    Opens a log file, or standard input for "__none__", as bytes. Compressed
+    data is detected by its magic bytes and decompressed as it is read.
+    """
+
+    if filename == "__none__":
+        f = sys.stdin.buffer
+    else:
+        f = open(filename, "rb")
+
+    method = compression(f)
+
+    if method is None:
+        return f
+
+    logging.debug("Decompressing " + method + ": " + filename)
+
+    if method == "gzip":
+        return gzip.GzipFile(fileobj=f)
+    elif method == "bzip2":
+        return bz2.BZ2File(f)
+    elif method == "xz":
+        return lzma.LZMAFile(f)
+    elif zstandard is not None:
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader( \
+                                 f, read_across_frames=True))
+    else:
+        print("Zstandard support is not installed, cannot read: " + filename)
+        sys.exit(16)
+
+
+def open_log(filename):
+    """Opens a log file, or standard input for "__none__", as text"""
+
+    if filename == "__none__" and compression(sys.stdin.buffer) is None:
+        return sys.stdin
+
+    encoding = locale.getpreferredencoding(False)
+    return io.TextIOWrapper(open_binary(filename), encoding=encoding)
+
+
+class Prefetch:
+    """
+    Reads the lines of a file in a background thread so that several
+    compressed files are decompressed in parallel while the parser works.
+    Lines are handed over in batches through a bounded queue.
+    """
+
+    batch_size = 1024
+    queue_size = 64
+
+    def __init__(self, f):
+        self.f = f
+        self.queue = queue.Queue(self.queue_size)
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+        # Share one iterator so a partial read can be resumed later
+        self.lines = self.batches()
+
+    def run(self):
+        batch = []
+
+        try:
+            for line in self.f:
+                batch.append(line)
+                if len(batch) >= self.batch_size:
+                    self.queue.put(batch)
+                    batch = []
+            self.queue.put(batch)
+
+        # Errors such as corrupt archives are raised in the reader
+        except Exception as e:
+            self.queue.put(e)
+
+        self.queue.put(None)
+
+    def __iter__(self):
+        return self.lines
+
+    def batches(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            elif isinstance(batch, Exception):
+                raise batch
+
+            for line in batch:
+                yield line
+
+
 class Tally():
+    """Votes cast for each driver by the lines sampled from a log"""
 
     matrix = {}
     tally_threshold = 0
@@ -37,7 +274,7 @@ class Tally():
     def is_type(self, entry_type):
 
         # Setup the correct tally logic method
-        tally_logic = eval(entry_type).tally_logic
+        tally_logic = entry_type.tally_logic
 
         m = self.matrix[entry_type]
         th = self.tally_threshold
@@ -54,34 +291,89 @@ class CrunchLog(UserList):
     Class which extends UserList to provide robust in memory log object
     """
 
-    def __init__(self, filename=""):
+    # Lines read from the head of the file to determine the entry type
+    # when streaming
+    head_lines = 1000
+
+    # Lines from the head of the file which vote on the entry type
+    detect_lines = 100
+
+    # Remember the entry type of each file by path, inode and the lines
+    # which voted on it
+    detect_cache = True
+    detect_cache_size = 1000
+
+    def __init__(self, filename="", stream=False, span=None, entry_type=None, mapped=False, prefetch=False,
+                 optional=False):
         UserList.__init__(self)
 
         buf = list()
+        self.stream = stream
+        self.source = None
+        self.files = []
 
         if filename == "":
             return
         elif filename == "__none__":
-            self.f = sys.stdin
+            self.f = open_log(filename)
+            self.files.append(self.f)
+            self.lines = self.f
+        elif mapped and not compressed(filename):
+            # Lines are decoded from the mapping as they are needed
+            logging.debug("Mapping File: " + filename)
+            self.f = open(filename, "rb")
+            self.files.append(self.f)
+            self.source = MappedFile(self.f)
+            self.span = span or (0, None)
+            self.lines = self.source.strings(*self.span)
+        elif span is not None:
+            # Only read the lines which start within the byte span
+            logging.debug("Opening File: " + filename + " " + str(span))
+            self.f = open_binary(filename)
+            self.files.append(self.f)
+            self.lines = self.read_span(span[0], span[1])
         else:
             logging.debug("Opening File: " + filename)
-            self.f = open(filename)
+            self.f = open_log(filename)
+            self.files.append(self.f)
 
-        for line in self.f:
-            buf.append(line)
+            # Read and decompress ahead of the parser in a thread
+            if prefetch:
+                self.lines = Prefetch(self.f)
+            else:
+                self.lines = self.f
+
+        if stream:
+            # Only keep the head of the file, the rest is read on iteration
+            buf = list(islice(self.lines, self.head_lines))
+            self.head = buf
+        else:
+            for line in self.lines:
+                buf.append(line)
 
-        if len(buf) < 1:
+        # Spans of a larger file may be empty, they carry their entry type
+        if len(buf) < 1 and entry_type is None and optional:
+            self.Entry = None
+            return
+        elif len(buf) < 1 and entry_type is None:
             print("No data found")
             sys.exit()
 
         # Automatically select entry type
-        self.Entry = self.select(buf)
+        if entry_type is None:
+            self.Entry = self.detect(filename, buf)
+        else:
+            self.Entry = entry_type
 
         # Save for introspective purpose
         self.payload_type = self.Entry.__name__
         self.file_name = filename
         self.build_date = datetime.datetime.now()
 
+        # Entries are built lazily when streaming
+        if stream:
+            return
+
         # Build from entry type
         counter = 0
         for line in buf:
@@ -95,46 +387,183 @@ class CrunchLog(UserList):
         del buf
 
     def __del__(self):
-        self.f.close()
+        for f in self.files:
+            f.close()
+
+    def __iter__(self):
+        if self.stream and self.source is not None:
+            return self.references()
+        elif self.stream:
+            return self.entries()
+        else:
+            return iter(self.data)
+
+    def entries(self):
+        """
+        Generator which builds one entry at a time from the head sample and
+        then the remainder of the file. A streaming Log can only be iterated
+        once.
+        """
+
+        head = self.head
+        self.head = []
+
+        counter = 0
+        for line in chain(head, self.lines):
+            try:
+                entry = self.Entry(line)
+            except (ValueError, TypeError):
+                print("Cannot parse values on line: " + str(counter))
+                sys.exit()
+
+            counter += 1
+            yield entry
+
+    def references(self):
+        """
+        Generator which builds one entry at a time from a mapped file and
+        yields a LineRef to it. Once the next line is read, the previous
+        reference releases its entry and only keeps the offset of its line.
+        """
+
+        counter = 0
+        previous = None
+        for offset, line in self.source.lines(*self.span):
+            try:
+                entry = self.Entry(line)
+            except (ValueError, TypeError):
+                print("Cannot parse values on line: " + str(counter))
+                sys.exit()
+
+            # The consumer is done with the previous line
+            if previous is not None and not previous.pinned:
+                previous.entry = None
+
+            counter += 1
+            previous = LineRef(self.source, offset, self.Entry, entry)
+            yield previous
+
+    def read_span(self, start, end):
+        """
+        Generator which decodes each line of the binary file which starts at
+        or after the start offset and before the end offset. The file is read
+        to the end when there is no end offset.
+        """
+
+        encoding = locale.getpreferredencoding(False)
+        position = start
+        self.f.seek(start)
+
+        for line in self.f:
+            if end is not None and position >= end:
+                break
+
+            position += len(line)
+            yield line.decode(encoding)
 
     def select(self, buf):
         """
-        Determines which type of entry to use when building CrunchLog by
-        by sampling the buffer and using a quarum based on votes for each
-        log type
+        Determines which type of entry to use when building CrunchLog. Each
+        of the first detect_lines lines of the buffer votes for the first
+        driver which accepts it, then the drivers are checked in order
+        against their own tally logic. When no driver passes, such as a
+        secure log with a few lines from other daemons, the driver with the
+        most votes is used.
         """
 
-        sample_lines = []
-        max_sample_lines = 10
-        t = Tally(entry_types, max_sample_lines)
+        sample_lines = [line.split() for line in buf[:self.detect_lines]]
+        t = Tally(entry_types, len(sample_lines))
 
-        if len(buf) >= 1:
+        # Build tallies for the sampled lines
+        for line in sample_lines:
+            for entry_type in entry_types:
+                if entry_type.is_type(line):
+                    t.append(entry_type)
+                    break
 
-            # Keep building samples until we get a good set
-            while (1):
+        # Tally logic is determined by driver
+        for entry_type in entry_types:
+            if t.is_type(entry_type):
+                logging.info("Determined " + \
+                entry_type.__name__ + ": " + str(t.matrix[entry_type]))
+
+                return entry_type
+
+        # Ties go to the driver checked first, RawEntry is the last resort
+        entry_type = max(entry_types, key=lambda x: t.matrix[x])
+        logging.info("Most votes " + \
+                     entry_type.__name__ + ": " + str(t.matrix[entry_type]))
 
-                # Get X number of samples
-                for i in range(0, max_sample_lines):
-                    sample_lines.append(choice(buf).split())
+        return entry_type
 
-                # Build tallies for the collected samples
-                for line in sample_lines:
-                    for entry_type in entry_types:
-                        if eval(entry_type).is_type(line):
-                            t.append(entry_type)
-                            break
+    def detect(self, filename, buf):
+        """
+        Selects the entry type of a file, remembering the result by path
+        and inode so the same file is not sampled again on later runs. A
+        checksum of the sampled lines is part of the key, so a new file
+        which reuses the path and inode is sampled again
+        """
 
-                # Tally logic is determined by driver
-                for entry_type in entry_types:
-                    if t.is_type(entry_type):
-                        logging.info("Determined " + \
-                        str(entry_type) + ": " + str(t.matrix[entry_type]))
+        if not isinstance(filename, str) or filename == "__none__" or \
+           not self.detect_cache:
+            return self.select(buf)
 
-                        return eval(entry_type)
+        sample = "".join(buf[:self.detect_lines])
+        key = os.path.abspath(filename) + " " + \
+              str(os.stat(filename).st_ino) + " " + \
+              str(crc32(sample.encode("utf-8", "replace")))
+        cache = self.read_detect_cache()
+
+        if cache.get(key) in drivers:
+            logging.info("Cached " + cache[key] + ": " + key)
+            return drivers[cache[key]]
+
+        Entry = self.select(buf)
+        cache[key] = Entry.__name__
+        self.write_detect_cache(cache)
+
+        return Entry
+
+    def read_detect_cache(self):
+        """Returns the cached entry types keyed by path and inode"""
+
+        cache = {}
+
+        try:
+            f = open(cache_path("drivers"))
+            for line in f:
+                name, key = line.rstrip("\n").split(" ", 1)
+                cache[key] = name
+            f.close()
+        except (IOError, ValueError):
+            pass
+
+        return cache
+
+    def write_detect_cache(self, cache):
+        """Saves the most recent entry types, failures are not fatal"""
+
+        path = cache_path("drivers")
+        keys = list(cache.keys())[-self.detect_cache_size:]
+
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+            f = open(path + ".tmp", "w")
+            for key in keys:
+                f.write(cache[key] + " " + key + "\n")
+            f.close()
+            os.rename(path + ".tmp", path)
+
+        except (IOError, OSError):
+            logging.debug("Could not write driver cache: " + path)
 
     def contains(self, obj):
         """Determine what kind of objects are contained in this Log"""
-        if len(self) >= 1:
+        if self.stream:
+            return issubclass(self.Entry, obj)
+        elif len(self) >= 1:
             return isinstance(self[len(self) - 1], obj)
         else:
             return False
@@ -155,18 +584,330 @@ class CrunchLog(UserList):
         return newlog
 
 
+class MergedLog(CrunchLog):
+    """
+    Streams the entries of several logs in time stamp order, such as a
+    rotation set or the per host files of a central syslog server. Each log
+    is streamed on its own and the entries are combined with a k-way merge
+    on a heap, so nothing is concatenated or sorted in memory. Entries with
+    the same time stamp are kept in the order the files were given.
+    """
+
+    def __init__(self, filenames, mapped=False):
+        UserList.__init__(self)
+
+        self.stream = True
+        self.source = None
+        self.files = []
+        self.logs = []
+
+        for filename in filenames:
+
+            # Compressed files are decompressed in parallel threads
+            prefetch = compressed(filename)
+            log = CrunchLog(filename, stream=True, mapped=mapped, \
+                            prefetch=prefetch, optional=True)
+
+            # Empty files are common in a rotation set
+            if log.Entry is None:
+                logging.info("No data found: " + filename)
+            else:
+                self.logs.append(log)
+
+        if len(self.logs) < 1:
+            print("No data found")
+            sys.exit()
+
+        # Hashes are built for the type of the first log
+        self.Entry = self.logs[0].Entry
+
+        # Save for introspective purpose
+        self.payload_type = self.Entry.__name__
+        self.file_name = filenames
+        self.build_date = datetime.datetime.now()
+
+    def __iter__(self):
+        return heapq.merge(*self.logs, key=entry_timestamp)
+
+
+class FollowedLog(CrunchLog):
+    """
+    Follows a growing file like tail -f. Iterating over the log yields the
+    entries appended to the file until the refresh interval has passed, so
+    each pass only costs the new lines. A truncated file is read again from
+    the start and when the file is replaced by log rotation the rest of the
+    old file is read before the new one is opened.
+    """
+
+    # Seconds to sleep when nothing has been appended
+    poll_interval = 0.5
+
+    # Bytes read at a time
+    read_size = 1 << 20
+
+    def __init__(self, filename, interval):
+        UserList.__init__(self)
+
+        self.stream = True
+        self.source = None
+        self.files = []
+        self.Entry = None
+        self.interval = interval
+        self.encoding = locale.getpreferredencoding(False)
+
+        # Lines are only parsed once they are complete
+        self.partial = b""
+        self.pending = []
+        self.counter = 0
+
+        self.file_name = filename
+        self.open()
+
+    def open(self):
+        """Opens the file which currently has the name"""
+
+        logging.debug("Following File: " + self.file_name)
+        self.f = open(self.file_name, "rb")
+        self.files = [self.f]
+        self.inode = os.fstat(self.f.fileno()).st_ino
+
+    def rotated(self):
+        """Determines if the name now belongs to another file"""
+
+        try:
+            return os.stat(self.file_name).st_ino != self.inode
+        except OSError:
+            # Keep reading the old file until the new one is created
+            return False
+
+    def read(self):
+        """Returns the complete lines appended since the last read"""
+
+        if os.fstat(self.f.fileno()).st_size < self.f.tell():
+            logging.info("File truncated, reading from the start: " + \
+                         self.file_name)
+            self.f.seek(0)
+            self.partial = b""
+
+        # Check before reading so nothing written to the old file is lost
+        rotated = self.rotated()
+        data = self.partial + self.f.read(self.read_size)
+
+        if rotated and len(data) <= len(self.partial):
+            logging.info("File rotated, reading the new file: " + \
+                         self.file_name)
+            self.f.close()
+            self.open()
+
+            # The last line of the old file will never be finished
+            if len(self.partial) > 0:
+                data = data + b"\n"
+
+        lines = data.split(b"\n")
+        self.partial = lines.pop()
+
+        return [line.decode(self.encoding) + "\n" for line in lines]
+
+    def wait(self):
+        """Waits for the first lines, which determine the entry type"""
+
+        while len(self.pending) < 1:
+            self.pending = self.read()
+            if len(self.pending) < 1:
+                time.sleep(self.poll_interval)
+
+        self.Entry = self.detect(self.file_name, \
+                                 self.pending[:self.head_lines])
+
+        # Save for introspective purpose
+        self.payload_type = self.Entry.__name__
+        self.build_date = datetime.datetime.now()
+
+    def entries(self):
+        """
+        Generator which builds the entries appended to the file until the
+        refresh interval has passed. Lines which cannot be parsed are skipped.
+        """
+
+        deadline = time.time() + self.interval
+        lines = self.pending
+        self.pending = []
+
+        while True:
+            for line in lines:
+                self.counter += 1
+                try:
+                    yield self.Entry(line)
+                except (ValueError, TypeError):
+                    logging.warning("Cannot parse values on line: " + \
+                                    str(self.counter))
+
+            if time.time() >= deadline:
+                return
+
+            # Sleep only when the file has been read to the end
+            lines = self.read()
+            if len(lines) < 1:
+                time.sleep(min(self.poll_interval, \
+                               max(0, deadline - time.time())))
+
+
+def entry_timestamp(entry):
+    """Sort key which orders entries by time"""
+
+    return entry.timestamp
+
+
+class MappedFile:
+    """Memory mapped file which is scanned for lines by offset"""
+
+    def __init__(self, f):
+
+        self.encoding = locale.getpreferredencoding(False)
+
+        # Empty files cannot be mapped
+        try:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.map = b""
+
+    def end_of_line(self, offset):
+        """Returns the offset just past the line which starts at offset"""
+
+        newline = self.map.find(b"\n", offset)
+        if newline < 0:
+            return len(self.map)
+        else:
+            return newline + 1
+
+    def lines(self, start=0, end=None):
+        """
+        Generator of offset and decoded text for each line which starts at
+        or after the start offset and before the end offset
+        """
+
+        if end is None:
+            end = len(self.map)
+
+        position = start
+        while position < end:
+            stop = self.end_of_line(position)
+            yield position, self.map[position:stop].decode(self.encoding)
+            position = stop
+
+    def strings(self, start=0, end=None):
+        """Generator of the decoded text of each line"""
+
+        for offset, line in self.lines(start, end):
+            yield line
+
+    def line(self, offset):
+        """Decodes the line which starts at offset"""
+
+        stop = self.end_of_line(offset)
+        return self.map[offset:stop].decode(self.encoding)
+
+
+class LineRef:
+    """
+    Reference to an entry by the offset of its line in a MappedFile. Fields
+    are read from the entry while it is held, otherwise the line is parsed
+    again from the mapping. Setting a field pins the entry so the change is
+    not lost. References are pickled as the entry they point to.
+    """
+
+    __slots__ = ("source", "offset", "Entry", "entry", "pinned")
+
+    def __init__(self, source, offset, Entry, entry=None):
+        self.source = source
+        self.offset = offset
+        self.Entry = Entry
+        self.entry = entry
+        self.pinned = False
+
+    def resolve(self):
+        """Returns the held entry or parses it from the mapping"""
+
+        if self.entry is None:
+            return self.Entry(self.source.line(self.offset))
+        else:
+            return self.entry
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
+
+    def __setattr__(self, name, value):
+        if name in LineRef.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            entry = self.resolve()
+            setattr(entry, name, value)
+            self.entry = entry
+            self.pinned = True
+
+    def __reduce__(self):
+        entry = self.resolve()
+        return (restore_entry, (self.Entry, entry.__reduce_ex__(2)[2]))
+
+
+def restore_entry(Entry, state):
+    """Rebuilds an entry from the slot state of a pickled LineRef"""
+
+    entry = Entry.__new__(Entry)
+    for name, value in state[1].items():
+        setattr(entry, name, value)
+
+    return entry
+
+
+def entry_state(entry):
+    """Returns the driver name and field values of an entry to be saved"""
+
+    if isinstance(entry, LineRef):
+        entry = entry.resolve()
+
+    return [entry.__class__.__name__, entry.__reduce_ex__(2)[2][1]]
+
+
+def load_entry(state):
+    """Rebuilds an entry saved with entry_state"""
+
+    return restore_entry(drivers[state[0]], (None, state[1]))
+
+
 class LogEntry:
     """Interface class which specifies generic log format for consumption
-    by other classes"""
-    year = ""
-    month = ""
-    day = ""
-    hour = ""
-    minute = ""
-    second = ""
-    host = ""
-    daemon = ""
-    log_entry = ""
+    by other classes. Fields are kept in slots because logs can hold
+    millions of entries. Time is held as one integer time stamp and the
+    year, month, day, hour, minute and second strings are derived from it
+    when they are read."""
+
+    __slots__ = ("timestamp", "host", "daemon", "log_entry")
+
+    def get_year(self):
+        return stamp_fields(self.timestamp)[0]
+
+    def get_month(self):
+        return stamp_fields(self.timestamp)[1]
+
+    def get_day(self):
+        return stamp_fields(self.timestamp)[2]
+
+    def get_hour(self):
+        return stamp_fields(self.timestamp)[3]
+
+    def get_minute(self):
+        return stamp_fields(self.timestamp)[4]
+
+    def get_second(self):
+        return stamp_fields(self.timestamp)[5]
+
+    year = property(get_year)
+    month = property(get_month)
+    day = property(get_day)
+    hour = property(get_hour)
+    minute = property(get_minute)
+    second = property(get_second)
 
     def display(self):
         print("Year: ", self.year, \
@@ -188,31 +929,32 @@ class LogEntry:
     tally_logic = staticmethod(tally_logic)
 
     def set_abnormal(self, value):
-        self.year, \
-        self.month, \
-        self.day, \
-        self.hour, \
-        self.minute, \
-        self.second, \
-        self.host, \
-        self.daemon = ["1900", "01", "01", "01", "01", "01", "#", "#"]
+        self.timestamp = abnormal_stamp
+        self.host, self.daemon = ["#", "#"]
         self.log_entry = ' '.join(value)
 
     def set_blank(self):
-        self.year, \
-        self.month, \
-        self.day, \
-        self.hour, \
-        self.minute, \
-        self.second, \
-        self.host, \
-        self.daemon = ["1900", "01", "01", "01", "01", "01", "#", "#"]
+        self.timestamp = abnormal_stamp
+        self.host, self.daemon = ["#", "#"]
         self.log_entry = "#"
 
 
+# Time stamp of entries which do not carry a time: 1900-01-01 01:01:01
+abnormal_stamp = epoch(1900, 1, 1, 1, 1, 1)
+
+
 class SyslogEntry(LogEntry):
     """Driver for Syslog. Conforms to LogEntry interface class."""
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {0: re.compile("[A-Z][a-z]{2}"),
+                1: re.compile("[0-9][0-9]?"),
+                2: re.compile("[0-9{2}:[0-9]{2}:[0-9]{2}"),
+                4: re.compile("^sshd\\["),
+                5: re.compile("^pam_")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -221,46 +963,43 @@ class SyslogEntry(LogEntry):
         # Should be normal log entry
         if len(value) >= 5:
 
-            # Syslog does not store year information so, set to current year
-            self.year = str(datetime.date.today().year)
-            self.month, self.day, clocktime, self.host, self.daemon = value[:5]
+            month, day, clocktime, self.host, self.daemon = value[:5]
             self.log_entry = ' '.join(value[5:])
-            self.hour, self.minute, self.second = clocktime.split(":")
-
-            # Convert month to integer
-            self.month = str(time.strptime(self.month, "%b")[1])
-
-            # Normalize integers to standard widths and convert to strings
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            self.timestamp = SyslogEntry.decode(month, day, clocktime)
 
         # Abnormal log entry
         elif len(value) >= 1:
-            self.year, \
-            self.month, \
-            self.day, \
-            self.hour, \
-            self.minute, \
-            self.second, \
-            self.host, \
-            self.daemon = ["1900", "01", "01", "01", "01", "01", "#", "#"]
-            self.log_entry = ' '.join(value)
+            self.set_abnormal(value)
 
         # Blank line, will be sorted out by scrub
         else:
-            self.year, \
-            self.month, \
-            self.day, \
-            self.hour, \
-            self.minute, \
-            self.second, \
-            self.host, \
-            self.daemon = ["1900", "01", "01", "01", "01", "01", "#", "#"]
-            self.log_entry = "#"
+            self.set_blank()
+
+    def decode(month, day, clocktime):
+        """
+        Converts a syslog time stamp such as "Feb 29 11:53:08" to an
+        integer time stamp. Consecutive lines usually share the same
+        second, so results are cached by the raw time stamp.
+        """
+
+        key = (month, day, clocktime)
+        stamps = SyslogEntry.stamps
+
+        if key not in stamps:
+            if len(stamps) >= stamp_cache_size:
+                stamps.clear()
+
+            # Syslog does not store year information so, set to current year
+            hour, minute, second = clocktime.split(":")
+            stamps[key] = epoch(datetime.date.today().year, \
+                                month_number(month), int(day), \
+                                int(hour), int(minute), int(second))
+
+        return stamps[key]
+
+    # Declare Static Methods
+    decode = staticmethod(decode)
+    stamps = {}
 
     def is_type(line):
         """Standard function from interface class to determine type"""
@@ -271,11 +1010,12 @@ class SyslogEntry(LogEntry):
 
             # Look for something similar to: "Feb 29 11:53:08" in first
             # three columns
-            if re.search("[A-Z][a-z]{2}", line[0]) and \
-               re.search("[0-9][0-9]?", line[1]) and \
-               re.search("[0-9{2}:[0-9]{2}:[0-9]{2}", line[2]) and not \
-               (re.search("^pam_", line[5]) or \
-               re.search("^sshd\[", line[4])):
+            p = SyslogEntry.patterns
+            if p[0].search(line[0]) and \
+               p[1].search(line[1]) and \
+               p[2].search(line[2]) and not \
+               (p[5].search(line[5]) or \
+               p[4].search(line[4])):
                 return True
             else:
                 return False
@@ -289,6 +1029,11 @@ class SyslogEntry(LogEntry):
 class RSyslogEntry(LogEntry):
     """Driver for RSyslog. Conforms to LogEntry interface class."""
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {0: re.compile("[0-9]{4}-[0-9]{2}-[0-9]{2}T")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -297,8 +1042,34 @@ class RSyslogEntry(LogEntry):
         # Should be normal log entry
         if len(value) >= 5:
 
+            self.timestamp = RSyslogEntry.decode(value[0])
+            self.host = value[1]
+            self.daemon = value[2]
+            self.log_entry = ' '.join(value[3:])
+
+        # Abnormal log entry
+        elif len(value) >= 1:
+            self.set_abnormal(value)
+
+        # Blank line, will be sorted out by scrub
+        else:
+            self.set_blank()
+
+    def decode(stamp):
+        """
+        Converts an rsyslog time stamp to an integer time stamp, results
+        are cached by the time stamp up to the second
+        """
+
+        key = stamp[:19]
+        stamps = RSyslogEntry.stamps
+
+        if key not in stamps:
+            if len(stamps) >= stamp_cache_size:
+                stamps.clear()
+
             # Complete major splits: 2010-06-24T17:56:32.197716-04:00
-            date, rtime = value[0].split("T")  # Raw time
+            date, rtime = stamp.split("T")  # Raw time
 
             # High precision time with timezone info: 17:56:32.197716-04:00
             hptime, offset = rtime.split("-")
@@ -306,49 +1077,23 @@ class RSyslogEntry(LogEntry):
             # Patch for mixed enviornments, milliseconds do not get logged
             # if older Ubuntu 8.04 boxes log to a newer 10.04 server with
             # Rsyslog precision time on.
-            if re.search("[0-9]{2}:[0-9]{2}:[0-9]{2}\.[0-9]{6}", hptime):
+            if RSyslogEntry.precision.search(hptime):
                 time, mseconds = hptime.split(".")  # Miliseconds
             else:
                 time = hptime
 
             # Complete secondary splits
-            self.year, self.month, self.day = date.split("-")
-            self.hour, self.minute, self.second = time.split(":")
-            self.host = value[1]
-            self.daemon = value[2]
-            self.log_entry = ' '.join(value[3:])
-
-            # Normalize integers to standard widths and convert to strings
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            year, month, day = date.split("-")
+            hour, minute, second = time.split(":")
+            stamps[key] = epoch(int(year), int(month), int(day), \
+                                int(hour), int(minute), int(second))
 
-        # Abnormal log entry
-        elif len(value) >= 1:
-            self.year, \
-            self.month, \
-            self.day, \
-            self.hour, \
-            self.minute, \
-            self.second, \
-            self.host, \
-            self.daemon = ["1900", "01", "01", "01", "01", "01", "#", "#"]
-            self.log_entry = ' '.join(value)
+        return stamps[key]
 
-        # Blank line, will be sorted out by scrub
-        else:
-            self.year, \
-            self.month, \
-            self.day, \
-            self.hour, \
-            self.minute, \
-            self.second, \
-            self.host, \
-            self.daemon = ["1900", "01", "01", "01", "01", "01", "#", "#"]
-            self.log_entry = "#"
+    # Declare Static Methods
+    decode = staticmethod(decode)
+    stamps = {}
+    precision = re.compile("[0-9]{2}:[0-9]{2}:[0-9]{2}\\.[0-9]{6}")
 
     def is_type(line):
         """Standard function from interface class to determine type"""
@@ -358,7 +1103,7 @@ class RSyslogEntry(LogEntry):
         if len(line) >= 1:
 
             # Look for something similar to: "2011-04-04T"
-            if re.search("[0-9]{4}-[0-9]{2}-[0-9]{2}T", line[0]):
+            if RSyslogEntry.patterns[0].search(line[0]):
                 return True
             else:
                 return False
@@ -372,6 +1117,12 @@ class RSyslogEntry(LogEntry):
 class ApacheAccessEntry(LogEntry):
     """Driver for Apache Access formatted log files"""
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {3: re.compile("[0-9]{2}/[a-zA-Z]{3}/[0-9]{4}:" \
+                              "[0-9{2}:[0-9]{2}:[0-9]{2}")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -393,30 +1144,9 @@ class ApacheAccessEntry(LogEntry):
             referer, \
             agent = value[:12]
             self.log_entry = uri
-
-            # Split up something that looks like this: [03/Aug/2009:11:53:08
-            datetime = apachedate.split(':')
-            date = datetime[0]
-            self.hour = datetime[1]
-            self.minute = datetime[2]
-            self.second = datetime[3]
-            dmy = date.split('/')
-            self.day = re.sub("\[", "", dmy[0])
-            self.month = dmy[1]
-            self.year = dmy[2]
+            self.timestamp = ApacheAccessEntry.decode(apachedate)
             self.host = uri
-            daemon = "webserver"
-
-            # Convert month to integer
-            self.month = time.strptime(self.month, "%b")[1]
-
-            # Normalize integers to standard widths and convert to strings
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            self.daemon = ""
 
         # Abnormal log entry
         elif len(value) >= 1:
@@ -426,6 +1156,33 @@ class ApacheAccessEntry(LogEntry):
         else:
             self.set_blank()
 
+    def decode(apachedate):
+        """
+        Converts an Apache time stamp to an integer time stamp, results are
+        cached by the raw time stamp
+        """
+
+        stamps = ApacheAccessEntry.stamps
+
+        if apachedate not in stamps:
+            if len(stamps) >= stamp_cache_size:
+                stamps.clear()
+
+            # Split up something that looks like this: [03/Aug/2009:11:53:08
+            datetime = apachedate.split(':')
+            date = datetime[0]
+            dmy = date.split('/')
+            stamps[apachedate] = epoch(int(dmy[2]), month_number(dmy[1]), \
+                                       int(dmy[0].replace("[", "")), \
+                                       int(datetime[1]), int(datetime[2]), \
+                                       int(datetime[3]))
+
+        return stamps[apachedate]
+
+    # Declare Static Methods
+    decode = staticmethod(decode)
+    stamps = {}
+
     def is_type(line):
         """Standard function from interface class to determine type"""
 
@@ -434,8 +1191,7 @@ class ApacheAccessEntry(LogEntry):
         if len(line) >= 4:
 
             # Look for: "03/Aug/2009:11:53:08" in forth column
-            r = "[0-9]{2}/[a-zA-Z]{3}/[0-9]{4}:[0-9{2}:[0-9]{2}:[0-9]{2}"
-            if re.search(r, line[3]):
+            if ApacheAccessEntry.patterns[3].search(line[3]):
                 return True
             else:
                 return False
@@ -449,6 +1205,13 @@ class ApacheAccessEntry(LogEntry):
 class ApacheErrorEntry(LogEntry):
     """Driver for Apache Error formatted log files"""
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {0: re.compile("[\\[a-zA-Z]{3}"),
+                3: re.compile("[0-9]{2}:[0-9]{2}:[0-9]{2}"),
+                4: re.compile("[0-9]{4}")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -459,23 +1222,10 @@ class ApacheErrorEntry(LogEntry):
             # Grab major chunks from the line
             # Split up something that looks like this:
             # [Sat Feb 27 12:16:10 2010]
-            junk, self.month, self.day, clocktime, self.year = value[:5]
+            self.timestamp = ApacheErrorEntry.decode(*value[1:5])
             self.log_entry = ' '.join(value[5:])
-            self.hour, self.minute, self.second = clocktime.split(":")
-
-            # Convert month to integer
-            self.month = time.strptime(self.month, "%b")[1]
-
-            # Clean up the year field
-            self.year = re.sub("\]", "", self.year)
-
-            # Normalize integers to standard widths and convert to strings
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            self.host = ""
+            self.daemon = ""
 
         # Abnormal log entry
         elif len(value) >= 1:
@@ -485,6 +1235,31 @@ class ApacheErrorEntry(LogEntry):
         else:
             self.set_blank()
 
+    def decode(month, day, clocktime, year):
+        """
+        Converts an Apache error time stamp to an integer time stamp,
+        results are cached by the raw time stamp
+        """
+
+        key = (month, day, clocktime, year)
+        stamps = ApacheErrorEntry.stamps
+
+        if key not in stamps:
+            if len(stamps) >= stamp_cache_size:
+                stamps.clear()
+
+            # Clean up the year field
+            hour, minute, second = clocktime.split(":")
+            stamps[key] = epoch(int(year.replace("]", "")), \
+                                month_number(month), int(day), \
+                                int(hour), int(minute), int(second))
+
+        return stamps[key]
+
+    # Declare Static Methods
+    decode = staticmethod(decode)
+    stamps = {}
+
     def is_type(line):
         """Standard function from interface class to determine type"""
 
@@ -493,9 +1268,10 @@ class ApacheErrorEntry(LogEntry):
         if len(line) >= 5:
 
             # Look for : [Sat Feb 27 12:16:10 2010]
-            if re.search("[[a-zA-Z]{3}", line[0]) and \
-               re.search("[0-9]{2}:[0-9]{2}:[0-9]{2}", line[3]) and \
-               re.search("[0-9]{4}", line[4]):
+            p = ApacheErrorEntry.patterns
+            if p[0].search(line[0]) and \
+               p[3].search(line[3]) and \
+               p[4].search(line[4]):
                 return True
             else:
                 return False
@@ -509,6 +1285,14 @@ class ApacheErrorEntry(LogEntry):
 class SecureLogEntry(LogEntry):
     """Driver for Syslog. Conforms to LogEntry interface class."""
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {1: re.compile("[0-9][0-9]?"),
+                2: re.compile("[0-9{2}:[0-9]{2}:[0-9]{2}"),
+                4: re.compile("^sshd\\["),
+                5: re.compile("^pam_")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -516,22 +1300,9 @@ class SecureLogEntry(LogEntry):
 
         # Should be normal log entry
         if len(value) >= 5:
-            # Syslog does not store year information so, set to current year
-            self.year = str(datetime.date.today().year)
-            self.month, self.day, clocktime, self.host, self.daemon = value[:5]
+            month, day, clocktime, self.host, self.daemon = value[:5]
             self.log_entry = ' '.join(value[5:])
-            self.hour, self.minute, self.second = clocktime.split(":")
-
-            # Convert month to integer
-            self.month = str(time.strptime(self.month, "%b")[1])
-
-            # Normalize integers to standard widths
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            self.timestamp = SyslogEntry.decode(month, day, clocktime)
 
         # Abnormal log entry
         elif len(value) >= 1:
@@ -549,10 +1320,11 @@ class SecureLogEntry(LogEntry):
         if len(line) >= 6:
 
             # Look for something similar to: "29 11:53:08" in third column
-            if re.search("[0-9][0-9]?", line[1]) \
-            and re.search("[0-9{2}:[0-9]{2}:[0-9]{2}", line[2]) \
-            and (re.search("^pam_", line[5]) \
-            or re.search("^sshd\[", line[4])):
+            p = SecureLogEntry.patterns
+            if p[1].search(line[1]) \
+            and p[2].search(line[2]) \
+            and (p[5].search(line[5]) \
+            or p[4].search(line[4])):
                 return True
             else:
                 return False
@@ -582,12 +1354,14 @@ class ScriptlogEntry(LogEntry):
     """
 
     # Extra variables
-    label = "__none__"
-    id = "__none__"
-    type = "__none__"
+    __slots__ = ("label", "id", "type")
 
     def __init__(self, line):
 
+        self.label = "__none__"
+        self.id = "__none__"
+        self.type = "__none__"
+
         # Split the line up
         value = line.split()
 
@@ -596,9 +1370,8 @@ class ScriptlogEntry(LogEntry):
 
             # Syslog does not store year information so scriptlog does not
             # So set to current year, set the other fields normally
-            self.year = datetime.date.today().year
-            self.month, \
-            self.day, \
+            month, \
+            day, \
             time, \
             self.host, \
             self.daemon, \
@@ -607,15 +1380,7 @@ class ScriptlogEntry(LogEntry):
             self.type = value[:8]
 
             self.log_entry = ' '.join(value[8:])
-            self.hour, self.minute, self.second = time.split(":")
-
-            # Normalize integers to standard widths and convert to strings
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            self.timestamp = SyslogEntry.decode(month, day, time)
 
         # Abnormal log entry
         elif len(value) >= 1:
@@ -653,6 +1418,11 @@ class RawEntry(LogEntry):
     values
     """
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {0: re.compile(".+")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -674,7 +1444,7 @@ class RawEntry(LogEntry):
         if len(line) >= 1:
 
             # Look for any length of text in the line
-            if re.search(".+", str(line)):
+            if RawEntry.patterns[0].search(str(line)):
                 return True
             else:
                 return False
@@ -690,6 +1460,12 @@ class SnortEntry(LogEntry):
     Driver for Snort formatted log files. Conforms to LogEntry interface class.
     """
 
+    __slots__ = ()
+
+    # Precompiled patterns for is_type, keyed by column
+    patterns = {0: re.compile("[0-9]{2}\\/[0-9]{2}\\-" \
+                              "[0-9]{2}\\:[0-9]{2}\\:[0-9]{2}\\.[0-9]{6}")}
+
     def __init__(self, line):
 
         # Split the line up
@@ -698,40 +1474,52 @@ class SnortEntry(LogEntry):
         # Should be normal log entry
         if len(value) >= 2:
 
-            # Snort does not store year information so, set to current year
-            self.year = datetime.date.today().year
-
-            # Initial break down
-            snortdate = value[:1]
+            # Looks like "09/29-10:18:46.026172"
+            snortdate, junk = value[0].split('.')
+            self.timestamp = SnortEntry.decode(snortdate)
             self.log_entry = ' '.join(value[1:])
+            self.host = ""
+            self.daemon = ""
 
-            # Looks like "09/29-10:18:46.026172"
-            snortdate, junk = snortdate[0].split('.')
+        # Abnormal value
+        elif len(value) >= 1:
+            self.set_abnormal(value)
+
+        # Blank line, will be sorted out by scrub
+        else:
+            self.set_blank()
+
+    def decode(snortdate):
+        """
+        Converts a Snort time stamp to an integer time stamp, results are
+        cached by the raw time stamp
+        """
+
+        stamps = SnortEntry.stamps
+
+        if snortdate not in stamps:
+            if len(stamps) >= stamp_cache_size:
+                stamps.clear()
 
             # Looks like "09/29-10:18:46"
-            self.month, snortdate = snortdate.split('/')
+            month, snortdate_rest = snortdate.split('/')
 
             # Looks like "29-10:18:46"
-            self.day, snortdate = snortdate.split('-')
+            day, clocktime = snortdate_rest.split('-')
 
             # Looks like "10:18:46"
-            self.hour, self.minute, self.second = snortdate.split(':')
+            hour, minute, second = clocktime.split(':')
 
-            # Normalize integers to standard widths and convert to strings
-            self.year = str("%.4d" % (int(self.year)))
-            self.month = str("%.2d" % (int(self.month)))
-            self.day = str("%.2d" % (int(self.day)))
-            self.hour = str("%.2d" % (int(self.hour)))
-            self.minute = str("%.2d" % (int(self.minute)))
-            self.second = str("%.2d" % (int(self.second)))
+            # Snort does not store year information so, set to current year
+            stamps[snortdate] = epoch(datetime.date.today().year, \
+                                      int(month), int(day), int(hour), \
+                                      int(minute), int(second))
 
-        # Abnormal value
-        elif len(value) >= 1:
-            self.set_abnormal(value)
+        return stamps[snortdate]
 
-        # Blank line, will be sorted out by scrub
-        else:
-            self.set_blank()
+    # Declare Static Methods
+    decode = staticmethod(decode)
+    stamps = {}
 
     def is_type(line):
 
@@ -740,8 +1528,7 @@ class SnortEntry(LogEntry):
         if len(line) >= 4:
 
             # Look for : "09/29-10:18:46.026172" in first column
-            r = "[0-9]{2}\/[0-9]{2}\-[0-9]{2}\:[0-9]{2}\:[0-9]{2}\.[0-9]{6}"
-            if re.search(r, line[0]):
+            if SnortEntry.patterns[0].search(line[0]):
                 return True
             else:
                 return False
@@ -763,6 +1550,10 @@ for i in list(ma.keys()):
         if issubclass(ma[i], ma['LogEntry']) and \
                       ma[i].__name__ != "LogEntry" and \
                       ma[i].__name__ != "RawEntry":
-            entry_types.append(ma[i].__name__)
+            entry_types.append(ma[i])
+
+entry_types.append(RawEntry)
 
-entry_types.append("RawEntry")
+# Registry of drivers by name
+drivers = dict([(entry_type.__name__, entry_type) \
+                for entry_type in entry_types])
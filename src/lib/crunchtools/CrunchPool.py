@@ -0,0 +1,87 @@
+"""
+Builds SuperHash and GraphHash objects from a single large log file with a
+pool of processes. The file is split into byte spans which are aligned to
+newlines, each span is parsed and hashed in its own process and the partial
+results are merged back together in file order.
+"""
+
+from multiprocessing import Pool
+from .CrunchLog import CrunchLog
+
+import os
+import sys
+import logging
+
+
+def split(filename, jobs):
+    """Splits a file into at most jobs spans of whole lines"""
+
+    size = os.path.getsize(filename)
+    spans = []
+    start = 0
+
+    f = open(filename, "rb")
+    for i in range(1, jobs):
+
+        # Move the boundary forward to the beginning of the next line
+        f.seek(max(start, size * i // jobs))
+        f.readline()
+        end = f.tell()
+
+        if end > start:
+            spans.append((start, end))
+            start = end
+
+    f.close()
+
+    if start < size:
+        spans.append((start, size))
+
+    return spans
+
+
+def build(task):
+    """Worker which builds a hash or graph from one span of the file"""
+
+    builder, filename, span, entry_type, mapped, args = task
+
+    try:
+        log = CrunchLog(filename, stream=True, span=span, \
+                        entry_type=entry_type, mapped=mapped)
+        return builder(log, *args)
+
+    # Drivers exit on unparsable lines, which would hang the pool
+    except SystemExit:
+        return None
+
+
+def crunch(builder, filename, entry_type, jobs, *args, mapped=False):
+    """
+    Calls builder(log, *args) for each span of the file in parallel and
+    merges the results. The builder can be any SuperHash or GraphHash
+    class or factory. Spans are read through a memory map when mapped is
+    set.
+    """
+
+    global logging
+
+    spans = split(filename, jobs)
+    logging.info("Spans: " + str(spans))
+
+    tasks = [(builder, filename, span, entry_type, mapped, args) \
+             for span in spans]
+
+    pool = Pool(len(spans))
+    results = pool.map(build, tasks)
+    pool.close()
+    pool.join()
+
+    if None in results:
+        sys.exit()
+
+    # Merge in file order so the first samples are preserved
+    result = results[0]
+    for partial in results[1:]:
+        result.merge(partial)
+
+    return result
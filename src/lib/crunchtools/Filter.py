@@ -1,10 +1,55 @@
 """Defines filter class for use with SuperHash"""
 
+from collections import OrderedDict
+
 import os
 import re
 import sys
 import logging
 
+# The regular expression parser is used to find literals in stopwords
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+
+def required_literal(pattern):
+    """
+    Returns a string which is part of every match of a compiled pattern, or
+    None. Only literals at the top level of the pattern are considered, the
+    longest run of them is used.
+    """
+
+    if pattern.flags & re.IGNORECASE or isinstance(pattern.pattern, bytes):
+        return None
+
+    try:
+        items = sre_parse.parse(pattern.pattern, pattern.flags)
+    except (re.error, TypeError):
+        return None
+
+    best = ""
+    run = ""
+
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            run = run + chr(av)
+            continue
+
+        best = max(best, run, key=len)
+        run = ""
+
+        # A repeated literal must appear at least once
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and \
+           av[0] >= 1 and len(av[2]) == 1 and av[2][0][0] == sre_parse.LITERAL:
+            best = max(best, chr(av[2][0][1]), key=len)
+
+    best = max(best, run, key=len)
+
+    return best or None
+
+
 class Filter:
     """Filter object used to load filters into memory once, to save on file operations"""
 
@@ -16,11 +61,24 @@ class Filter:
                   "/opt/petit/var/lib/filters/" ]
 
     stopwords = []
+    steps = []
+
+    # Bytes of memory used to remember scrubbed strings, 0 disables it
+    cache_limit = 16 * 1024 * 1024
+
+    # Estimated bytes used by the cache for each string besides its text
+    cache_overhead = 100
 
     def __init__(self, file="__none__"):
 
         global logging
 
+        # Least recently used strings are first
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
         for prefix in self.prefixes:
 
             # Set class variable to file & path
@@ -47,17 +105,97 @@ class Filter:
 
         logging.info("Filter File: "+str(self.file))
 
+        self.compile()
+
+    def compile(self):
+        """
+        Builds the scrub pipeline from the stopwords. Each step is the bound
+        substitution of a stopword and a literal which must be present in
+        the string for the stopword to match, so most steps are skipped with
+        a substring test.
+        """
+
+        self.steps = [(stopword.sub, required_literal(stopword)) \
+                      for stopword in self.stopwords]
+
     def scrub(self, string):
         """Used to remove entries and replace them with the scrub character"""
 
         global logging
 
+        # Diagnostics are only built when debugging
+        if logging.root.isEnabledFor(logging.DEBUG):
+            return self.trace(string)
+
+        if len(self.steps) < 1:
+            return string
+
+        # Log lines repeat, so most strings have been scrubbed before
+        scrubbed = self.cache.get(string)
+        if scrubbed is not None:
+            self.hits += 1
+            self.cache.move_to_end(string)
+            return scrubbed
+
+        self.misses += 1
+        scrubbed = string
+
+        # Replace matches with hash signs, each stopword sees the result
+        # of the ones before it
+        for sub, literal in self.steps:
+            if literal is None or literal in scrubbed:
+                scrubbed = sub("#", scrubbed)
+
+        self.remember(string, scrubbed)
+
+        return scrubbed
+
+    def remember(self, string, scrubbed):
+        """Caches a scrubbed string, dropping the least recently used ones"""
+
+        if self.cache_limit <= 0:
+            return
+
+        self.cache[string] = scrubbed
+        self.cache_bytes += self.size(string, scrubbed)
+
+        while self.cache_bytes > self.cache_limit and len(self.cache) > 0:
+            old_string, old_scrubbed = self.cache.popitem(last=False)
+            self.cache_bytes -= self.size(old_string, old_scrubbed)
+
+    def size(self, string, scrubbed):
+        """Estimates the memory used by a cached string"""
+
+        return sys.getsizeof(string) + sys.getsizeof(scrubbed) + \
+               self.cache_overhead
+
+    def statistics(self):
+        """Describes how well the cache of scrubbed strings worked"""
+
+        return "Scrub Cache: " + str(self.hits) + " hits, " + \
+               str(self.misses) + " misses, " + str(len(self.cache)) + \
+               " strings, " + str(self.cache_bytes) + " bytes"
+
+    def __getstate__(self):
+        """The cache is not copied when a filter is sent to another process"""
+
+        state = self.__dict__.copy()
+        state["cache"] = OrderedDict()
+        state["cache_bytes"] = 0
+
+        return state
+
+    def trace(self, string):
+        """Scrubs a string and logs every substitution"""
+
+        global logging
+
         # Check each stopword against each key
         for stopword in self.stopwords:
 
             # Replace mathces with hash signs
             old_string = string
-            string = re.sub(stopword, "#", string)
+            string = stopword.sub("#", string)
             logging.debug(" SCRUBBING "+old_string+" OF "+stopword.pattern+" BECOMES "+string)
 
         return string
@@ -69,3 +207,94 @@ class Filter:
             return True
         else:
             return False
+
+
+class RuleTable:
+    """
+    Rewrite rules loaded from a rules file in the filters directory. Each
+    line holds a regular expression and its replacement separated by a tab.
+    The rules are compiled once and a line is only checked against the
+    rules whose literal text it contains.
+    """
+
+    global logging
+
+    file = ""
+    rules = []
+    dispatch = None
+
+    def __init__(self, file="__none__"):
+
+        global logging
+
+        self.rules = []
+
+        for prefix in Filter.prefixes:
+
+            self.file = prefix+file
+
+            if file == "__none__":
+                return
+
+            if os.path.exists(self.file):
+                try:
+                    f = open(self.file)
+                    for line in f.readlines():
+                        line = line.rstrip("\r\n")
+
+                        # Skip comments and blank lines
+                        if len(line.strip()) < 1 or line.startswith("#"):
+                            continue
+
+                        pattern, replacement = line.split("\t", 1)
+                        self.rules.append((re.compile(pattern), replacement))
+                    f.close()
+                    break
+
+                except IOError:
+                    print("Could not open Rules file",self.file)
+                    sys.exit(16)
+                except (ValueError, re.error):
+                    print("Bad rule in Rules file",self.file+":",line)
+                    sys.exit(16)
+
+        # Lines would be keyed differently without the rules
+        else:
+            logging.warning("Could not locate Rules file: "+file+ \
+                            ", lines are not normalized")
+
+        logging.info("Rules File: "+str(self.file))
+
+        self.compile()
+
+    def compile(self):
+        """
+        Builds one pattern which finds the literal of any rule, so lines
+        which no rule can change are passed over with a single search
+        """
+
+        self.steps = [(pattern.sub, replacement, required_literal(pattern)) \
+                      for pattern, replacement in self.rules]
+
+        literals = [literal for sub, replacement, literal in self.steps]
+
+        if len(literals) > 0 and None not in literals:
+            self.dispatch = re.compile("|".join( \
+                [re.escape(literal) for literal in sorted(set(literals))]))
+        else:
+            self.dispatch = None
+
+    def apply(self, string):
+        """Rewrites a string with every rule which matches it, in order"""
+
+        if len(self.steps) < 1:
+            return string
+
+        if self.dispatch is not None and not self.dispatch.search(string):
+            return string
+
+        for sub, replacement, literal in self.steps:
+            if literal is None or literal in string:
+                string = sub(replacement, string)
+
+        return string
@@ -0,0 +1,197 @@
+"""
+Compiles the fingerprint files into one index of their scrubbed keys so
+that --fingerprint does not parse and hash every fingerprint on each run.
+The index is kept in the petit cache directory and is rebuilt whenever a
+fingerprint file or the hash filter is added, removed or modified.
+"""
+
+from .CrunchLog import CrunchLog
+from .CrunchLog import cache_path
+from .CrunchLog import entry_state
+from .CrunchLog import load_entry
+from .Filter import Filter
+
+import os
+import re
+import sys
+import json
+import logging
+
+
+class FingerprintIndex:
+    """Keys and sample entry of every fingerprint, largest file first"""
+
+    version = 1
+
+    # Share of the keys of a fingerprint which must be found to match it
+    threshold_coefficient = 0.31
+
+    prefixes =  [ \
+        "/var/lib/petit/fingerprints/", \
+        "/usr/local/petit/var/lib/fingerprints/", \
+        "/opt/petit/var/lib/fingerprints/"]
+
+    library_prefixes =  [ \
+        "/var/lib/petit/fingerprint_library/", \
+        "/usr/local/petit/var/lib/fingerprint_library/", \
+        "/opt/petit/var/lib/fingerprint_library/"]
+
+    def __init__(self, builder, filter_filename="hash.stopwords"):
+
+        global logging
+
+        self.path = cache_path("fingerprints.index")
+        self.prefix = self.directory(self.prefixes)
+
+        if self.prefix is None:
+            print(("Could not locate fingerprint files: ", self.prefixes[-1]))
+            sys.exit()
+
+        self.library_prefix = self.directory(self.library_prefixes)
+        self.filter_filename = filter_filename
+
+        sources = self.sources()
+        index = self.read()
+
+        if index is None or index["sources"] != sources:
+            logging.info("Compiling Fingerprints: " + self.path)
+            index = {"version": self.version,
+                     "sources": sources,
+                     "fingerprints": self.compile(builder)}
+            self.write(index)
+
+        self.fingerprints = index["fingerprints"]
+
+    def directory(self, prefixes):
+        """Returns the first prefix which holds any files, or None"""
+
+        for prefix in prefixes:
+            if os.path.exists(prefix) and len(os.listdir(prefix)) >= 1:
+                return prefix
+
+        return None
+
+    def files(self, prefix):
+        """
+        Returns the fingerprint files of a directory from largest to
+        smallest, which prevents double labeling with similar fingerprints
+        """
+
+        if prefix is None:
+            return []
+
+        files = [os.path.join(prefix, f) for f in os.listdir(prefix)]
+        files.sort(key=lambda x: os.path.getsize(x))
+        files.reverse()
+
+        return [f for f in files if re.search("fp", f)]
+
+    def filter_file(self):
+        """Returns the path of the filter used to hash fingerprints"""
+
+        for prefix in Filter.prefixes:
+            if os.path.exists(prefix + self.filter_filename):
+                return prefix + self.filter_filename
+
+        return None
+
+    def sources(self):
+        """Lists the path, modification time and size of each input"""
+
+        paths = self.files(self.prefix) + self.files(self.library_prefix)
+        if self.filter_file() is not None:
+            paths.append(self.filter_file())
+
+        sources = []
+        for path in paths:
+            status = os.stat(path)
+            sources.append([path, status.st_mtime_ns, status.st_size])
+
+        return sources
+
+    def compile(self, builder):
+        """Hashes every fingerprint file with builder(log, filter_filename)"""
+
+        fingerprints = []
+
+        for library, prefix in ((False, self.prefix), \
+                                (True, self.library_prefix)):
+            for fingerprint_file in self.files(prefix):
+
+                # Build a Log and a SuperHash for the fingerprint
+                log = CrunchLog(fingerprint_file)
+                x = builder(log, self.filter_filename)
+
+                if len(x) < 1:
+                    continue
+
+                # The sample of a found fingerprint is taken from its
+                # last key
+                keys = list(x.keys())
+                fingerprints.append({
+                    "name": re.sub(prefix, "", fingerprint_file),
+                    "library": library,
+                    "keys": keys,
+                    "sample": entry_state(x[keys[-1]][1][0])})
+
+        return fingerprints
+
+    def read(self):
+        """Returns the saved index, or None when it can not be used"""
+
+        try:
+            f = open(self.path)
+            index = json.load(f)
+            f.close()
+        except (IOError, ValueError):
+            return None
+
+        if not isinstance(index, dict) or \
+           index.get("version") != self.version:
+            return None
+
+        return index
+
+    def write(self, index):
+        """Saves the index, failures are not fatal"""
+
+        try:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+
+            f = open(self.path + ".tmp", "w")
+            json.dump(index, f, separators=(",", ":"))
+            f.close()
+            os.rename(self.path + ".tmp", self.path)
+
+        except (IOError, OSError):
+            logging.debug("Could not write fingerprint index: " + self.path)
+
+    def matchable(self):
+        """Fingerprints which are removed from hashes, not the library"""
+
+        return [fingerprint for fingerprint in self.fingerprints \
+                if not fingerprint["library"]]
+
+    def inverted(self, fingerprints):
+        """Maps each key to the positions of the fingerprints holding it"""
+
+        inverted = {}
+        for i, fingerprint in enumerate(fingerprints):
+            for key in fingerprint["keys"]:
+                inverted.setdefault(key, []).append(i)
+
+        return inverted
+
+    def threshold(self, fingerprint):
+        """Number of keys of a fingerprint which must be exceeded to match"""
+
+        return len(fingerprint["keys"]) * self.threshold_coefficient
+
+    def sample(self, fingerprint):
+        """Returns the entry which stands for a found fingerprint"""
+
+        entry = load_entry(fingerprint["sample"])
+        entry.log_entry = fingerprint["name"]
+
+        return entry
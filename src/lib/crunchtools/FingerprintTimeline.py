@@ -0,0 +1,173 @@
+"""
+Finds when fingerprints such as reboots happened instead of only if they
+happened. A sliding window of time is kept over the entries of a log and
+each fingerprint is scored by the number of its keys inside the window.
+Scores are updated as entries enter and leave the window, so the log is
+read once and no window is ever hashed again.
+"""
+
+from .LogHash import SuperHash
+from .FingerprintIndex import FingerprintIndex
+from .Filter import Filter
+from .CrunchLog import stamp_fields
+
+from collections import deque
+
+import logging
+
+
+class FingerprintTimeline:
+    """Every occurrence of a fingerprint with its first and last time stamp"""
+
+    # Seconds of log kept in the window
+    window = 600
+
+    def __init__(self, log, window=None):
+
+        global logging
+
+        if window is not None:
+            self.window = window
+
+        self.index = FingerprintIndex(SuperHash.build_fingerprint)
+        self.fingerprints = self.index.matchable()
+        self.inverted = self.index.inverted(self.fingerprints)
+        self.keys = [set(fingerprint["keys"]) \
+                     for fingerprint in self.fingerprints]
+        self.thresholds = [self.index.threshold(fingerprint) \
+                           for fingerprint in self.fingerprints]
+
+        # Entries with fingerprint keys inside the window, by time stamp
+        self.entries = deque()
+        self.counts = {}
+
+        # Keys of each fingerprint inside the window, and the start and end
+        # of the fingerprints which are found
+        self.scores = [0] * len(self.fingerprints)
+        self.active = [None] * len(self.fingerprints)
+
+        self.occurrences = []
+
+        if log != ["__none__"]:
+            self.fill(log)
+
+    def fill(self, log):
+        """Slides the window over the entries of a log"""
+
+        # Keys are built the same way as the keys of the fingerprints
+        x = SuperHash.subtype(log)(["__none__"])
+        x.filter = Filter("hash.stopwords")
+
+        for entry in log:
+            timestamp = entry.timestamp
+
+            # Drop the entries which fell out of the window
+            while len(self.entries) > 0 and \
+                  self.entries[0][0] <= timestamp - self.window:
+                self.remove(self.entries.popleft()[1])
+
+            key = x.key(entry)
+            if key not in self.inverted:
+                continue
+
+            self.entries.append((timestamp, key))
+            self.add(key, timestamp)
+
+        # Fingerprints still found at the end of the log
+        for i in range(len(self.active)):
+            if self.active[i] is not None:
+                self.finish(i)
+
+    def add(self, key, timestamp):
+        """Counts a key entering the window"""
+
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+
+        # Lines are not always in order, so the earliest and latest time
+        # stamps are kept
+        for i in self.inverted[key]:
+            if self.active[i] is not None:
+                self.active[i][0] = min(self.active[i][0], timestamp)
+                self.active[i][1] = max(self.active[i][1], timestamp)
+
+            if count == 0:
+                self.scores[i] += 1
+                if self.active[i] is None and \
+                   self.scores[i] > self.thresholds[i]:
+                    self.activate(i)
+
+    def remove(self, key):
+        """Counts a key leaving the window"""
+
+        self.counts[key] -= 1
+        if self.counts[key] > 0:
+            return
+
+        del self.counts[key]
+
+        for i in self.inverted[key]:
+            self.scores[i] -= 1
+            if self.active[i] is not None and \
+               self.scores[i] <= self.thresholds[i]:
+                self.finish(i)
+
+    def score(self, i):
+        """
+        Counts the keys of a fingerprint inside the window which are not
+        held by a larger fingerprint that was found, which prevents double
+        labeling with similar fingerprints
+        """
+
+        score = 0
+        for key in self.keys[i]:
+            if key not in self.counts:
+                continue
+
+            for j in self.inverted[key]:
+                if j < i and self.active[j] is not None:
+                    break
+            else:
+                score += 1
+
+        return score
+
+    def activate(self, i):
+        """Starts an occurrence of a fingerprint"""
+
+        if self.score(i) <= self.thresholds[i]:
+            return
+
+        # The occurrence spans the keys of the fingerprint inside the window
+        stamps = [stamp for stamp, key in self.entries if key in self.keys[i]]
+        start = min(stamps)
+
+        self.active[i] = [start, max(stamps)]
+        logging.info("Found Fingerprint:" + self.fingerprints[i]["name"] + \
+                     " at " + self.date(start))
+
+        # Smaller fingerprints which were only found through the keys of
+        # this one are dropped
+        for j in range(i + 1, len(self.active)):
+            if self.active[j] is not None and \
+               self.score(j) <= self.thresholds[j]:
+                self.active[j] = None
+
+    def finish(self, i):
+        """Records an occurrence of a fingerprint which left the window"""
+
+        start, end = self.active[i]
+        self.occurrences.append((start, end, self.fingerprints[i]["name"]))
+        self.active[i] = None
+
+    def date(self, timestamp):
+        """Formats a time stamp as a date and time"""
+
+        fields = stamp_fields(timestamp)
+        return "-".join(fields[:3]) + " " + ":".join(fields[3:])
+
+    def display(self):
+        """Displays every occurrence in order of its start"""
+
+        for start, end, name in sorted(self.occurrences):
+            print(self.date(start) + "\t" + self.date(end) + "\t" + name)
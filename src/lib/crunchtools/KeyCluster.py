@@ -0,0 +1,97 @@
+"""
+Groups hash keys which differ by a few words, such as the same message with
+a different user or file name. Each key is reduced to a short MinHash
+signature of its words and keys are bucketed by bands of their signature,
+so only keys which share a bucket are compared. The work grows with the
+number of keys instead of the number of pairs of keys.
+"""
+
+from zlib import crc32
+
+
+class KeyCluster:
+    """Clusters of keys whose sets of words are similar"""
+
+    # Signature of one permutation hashing, split into bands of rows
+    bins = 32
+    rows = 2
+
+    def __init__(self, similarity=0.7):
+
+        self.similarity = similarity
+
+        # Index of the first key of the cluster of each key
+        self.parents = []
+
+    def signature(self, words):
+        """
+        Returns the smallest hash of the words falling into each bin. Empty
+        bins borrow the value of the next bin, so keys with few words can
+        still be compared bin by bin.
+        """
+
+        bins = [None] * self.bins
+
+        for word in words:
+            h = crc32(word.encode("utf-8", "replace"))
+            i = h % self.bins
+            if bins[i] is None or h < bins[i]:
+                bins[i] = h
+
+        # Walk backwards around the bins twice carrying the next value
+        signature = [None] * self.bins
+        carry = None
+        for i in range(2 * self.bins - 1, -1, -1):
+            value = bins[i % self.bins]
+            if value is not None:
+                carry = value
+            elif carry is not None:
+                carry += 1
+
+            if i < self.bins:
+                signature[i] = carry
+
+        return signature
+
+    def jaccard(self, a, b):
+        """Share of the words of two keys which both of them hold"""
+
+        if len(a) < 1 and len(b) < 1:
+            return 1.0
+
+        return float(len(a & b)) / len(a | b)
+
+    def cluster(self, keys):
+        """Returns lists of the positions of similar keys"""
+
+        words = [set(key.split()) for key in keys]
+        self.parents = list(range(len(keys)))
+        buckets = {}
+
+        for i in range(len(keys)):
+            if len(words[i]) < 1:
+                continue
+
+            signature = self.signature(words[i])
+            tried = set()
+
+            for band in range(0, self.bins, self.rows):
+                bucket = (band, tuple(signature[band:band + self.rows]))
+
+                # Each key is compared with the first key of the cluster of
+                # the first key in the bucket, which keeps clusters from
+                # drifting through chains of similar keys
+                first = self.parents[buckets.setdefault(bucket, i)]
+                if first == i or first in tried:
+                    continue
+
+                tried.add(first)
+                if self.jaccard(words[first], words[i]) >= self.similarity:
+                    self.parents[i] = first
+                    break
+
+        clusters = {}
+        for i in range(len(keys)):
+            clusters.setdefault(self.parents[i], []).append(i)
+
+        return list(clusters.values())
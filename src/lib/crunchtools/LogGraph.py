@@ -1,10 +1,14 @@
-from collections import UserDict
+from itertools import chain
 from math import ceil
+from .HyperLogLog import HyperLogLog
+from .LogHash import SuperHash
+from .CrunchLog import epoch
+from .CrunchLog import stamp_fields
 import datetime
 import sys
 import logging
 
-class GraphHash(UserDict):
+class GraphHash:
     """Interface class used to control structure & use of all GraphHash subtypes"""
 
     start_date = datetime.date.today()
@@ -22,38 +26,343 @@ class GraphHash(UserDict):
     width = False
     duration = ""
     unit = ""
+    early = {}
+
+    # Each subtype is a configuration of the same engine. Time stamps are
+    # turned into the number of the unit of time they fall in, counted from
+    # 1970, and counted in a flat list from the first bucket of the window
+    # to its last. Calendar steps may skip a month, so the buckets which
+    # are graphed are listed as well
+    seconds = None
+    fields = 6
+    first = 0
+    counts = []
+    buckets = []
+
+    # Field whose distinct values are counted in each bucket instead of
+    # lines, one of host, daemon or key. Keys are built by a hash of the
+    # type of the log and scrubbed with the filter
+    distinct = None
+    filter = None
+    hasher = None
+    sketches = {}
+
+    # Attributes which describe the time covered by a graph
+    window = ("second", "minute", "hour", "day", "month", "year", "unit",
+              "duration", "start_date", "middle_date", "end_date")
+
+    def __init__(self, log, first_entry=None):
+
+        # Turn first line into syslog, logs may be streamed so only
+        # a single pass is made over the entries. The first entry is
+        # given when the log is only one part of a larger file
+        entries = iter(log)
+        if first_entry is None:
+            first_entry = next(entries, None)
+            if first_entry is None:
+                sys.exit()
+            entries = chain([first_entry], entries)
+
+        # Keys are built the same way as the keys of --hash, graphs of
+        # later windows of a followed log reuse the first hash
+        if self.distinct == "key" and GraphHash.hasher is None:
+            GraphHash.hasher = SuperHash.subtype(log)(["__none__"])
+            GraphHash.hasher.filter = self.filter
+
+        # The window starts at the first entry, rounded down to the unit
+        names = ("year", "month", "day", "hour", "minute", "second")
+        for i, name in enumerate(names):
+            if i < self.fields:
+                setattr(self, name, str(getattr(first_entry, name)))
+            elif name in ("month", "day"):
+                setattr(self, name, 1)
+            else:
+                setattr(self, name, 0)
+
+        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
+
+        # Step through the window the same way for every subtype, steps
+        # which land in the same bucket only create it once
+        buckets = set()
+        for i in range(0, self.duration):
+
+            # Calculate the current date, the last one will be the end date
+            end_date = start_date + self.step(i)
+            buckets.add(self.bucket(epoch(end_date.year, end_date.month, end_date.day, end_date.hour, end_date.minute, end_date.second)))
+
+            # Check for middle date and save
+            if i == (self.duration//2):
+                middle_date = end_date
+
+        # Save final values
+        self.start_date = start_date
+        self.middle_date = middle_date
+        self.end_date = end_date
+
+        # Zero out each bucket, this will fill in blanks which
+        # may be in the log, especially sparse logs.
+        self.buckets = sorted(buckets)
+        self.first = self.buckets[0]
+        self.counts = [0] * (self.buckets[-1] - self.first + 1)
+
+        # Count each entry in the window built above
+        self.fill(entries)
+
+    def step(self, i):
+        """Returns the time from the start of the window to its i-th bucket"""
+        return datetime.timedelta(seconds=i*self.seconds)
+
+    def bucket(self, timestamp):
+        """Returns the number of the unit of time a time stamp falls in"""
+        return timestamp // self.seconds
+
+    def stamp(self, bucket):
+        """Returns the time stamp at the start of a bucket"""
+        return bucket * self.seconds
+
+    def label(self, bucket):
+        """Creates key rooted in time, as saved in reports"""
+        return "".join(stamp_fields(self.stamp(bucket))[:self.fields])
+
+    def parse(self, label):
+        """Returns the bucket of a key created by label"""
 
-    def increment(self, key):
-        """Adds new entry. Similar to append method on list"""
+        values = [int(label[0:4])] + \
+                 [int(label[i:i+2]) for i in range(4, len(label), 2)]
+        values += [1, 1, 0, 0, 0][len(values)-1:]
 
-        # Check to make sure it exists
-        if key not in self:
-            self[key] = 0
+        return self.bucket(epoch(*values))
 
-        # Increment the hashed count
-        # Create an array of un-hashed values for sampling later
-        self[key] += 1
+    def values(self):
+        """Returns the counts of the buckets which are graphed"""
+        return [self.counts[bucket - self.first] for bucket in self.buckets]
 
-    def zero(self, key):
-        """Creates empty entry"""
+    def value(self, entry):
+        """Returns the field of an entry whose distinct values are counted"""
 
-        # Check to make sure it exists
-        if key not in self:
-            self[key] = 0
+        if self.distinct == "key":
+            return self.hasher.key(entry)
+        else:
+            return getattr(entry, self.distinct)
+
+    def add(self, bucket, entry):
+        """Adds the value of an entry to the sketch of a bucket"""
+
+        # Valueless lines are dropped from hashes and are not counted
+        value = self.value(entry)
+        if self.distinct == "key" and value == "#":
+            return
+
+        sketch = self.sketches.get(bucket)
+        if sketch is None:
+            sketch = HyperLogLog()
+            self.sketches[bucket] = sketch
+
+        sketch.add(value)
+
+    def estimate(self):
+        """Sets each bucket to the number of distinct values in its sketch"""
+
+        if self.distinct is None:
+            return
+
+        for bucket in self.buckets:
+            if bucket in self.sketches:
+                self.counts[bucket - self.first] = self.sketches[bucket].count()
+
+    def merge(self, other):
+        """
+        Adds the counts of another graph of the same type. The merged graph
+        covers the window of the graph which starts first, counts outside of
+        it are dropped as they would be when graphing both logs as one.
+        Sketches of distinct values are merged instead of counts.
+        """
+
+        counts = []
+        for graph in (self, other):
+            counts.extend(zip(graph.buckets, graph.values()))
+            counts.extend(graph.early.items())
+
+        if other.start_date < self.start_date:
+            for name in self.window:
+                setattr(self, name, getattr(other, name))
+            self.buckets = other.buckets
+            self.first = other.first
+            self.counts = [0] * len(other.counts)
+        else:
+            self.counts = [0] * len(self.counts)
+
+        self.early = {}
+
+        if self.distinct is not None:
+            for bucket in other.sketches:
+                if bucket in self.sketches:
+                    self.sketches[bucket].merge(other.sketches[bucket])
+                else:
+                    self.sketches[bucket] = other.sketches[bucket]
+
+            # Sketches from before the window are kept like early counts
+            for bucket in list(self.sketches.keys()):
+                if bucket not in self.buckets and bucket >= self.first:
+                    del self.sketches[bucket]
+
+            self.estimate()
+
+        else:
+            for bucket, count in counts:
+                i = bucket - self.first
+                if i >= len(self.counts):
+                    continue
+                elif i >= 0:
+                    self.counts[i] += count
+                else:
+                    self.early[bucket] = self.early.get(bucket, 0) + count
+
+        # Recalculate now that the counts have changed
+        self.max_value = 0
+        self.build_calculations()
 
-    def build_calculations(self): 
+    def dump(self):
+        """
+        Returns the window and counts as lists and dictionaries which can
+        be saved as JSON and loaded with restore
+        """
+
+        window = {}
+        for name in self.window:
+            value = getattr(self, name)
+            if isinstance(value, datetime.datetime):
+                value = value.isoformat()
+            window[name] = value
+
+        data = {"type": self.__class__.__name__,
+                "window": window,
+                "buckets": dict([(self.label(bucket), count) for bucket, count \
+                                 in zip(self.buckets, self.values())]),
+                "early": dict([(self.label(bucket), self.early[bucket]) \
+                               for bucket in self.early])}
+
+        if self.distinct is not None:
+            data["distinct"] = self.distinct
+            data["sketches"] = dict([(self.label(bucket), \
+                                      self.sketches[bucket].dump()) \
+                                     for bucket in self.sketches])
+
+        return data
+
+    def restore(data):
+        """Factory method which rebuilds a GraphHash saved with dump"""
+
+        for Graph in GraphHash.__subclasses__():
+            if Graph.__name__ == data["type"]:
+                break
+        else:
+            raise ValueError("Unknown graph type: " + str(data["type"]))
+
+        x = Graph.__new__(Graph)
+
+        for name in x.window:
+            value = data["window"][name]
+            if name.endswith("_date"):
+                value = datetime.datetime.fromisoformat(value)
+            setattr(x, name, value)
+
+        buckets = dict([(x.parse(key), count) \
+                        for key, count in data["buckets"].items()])
+        x.buckets = sorted(buckets)
+        x.first = x.buckets[0]
+        x.counts = [buckets.get(bucket, 0) \
+                    for bucket in range(x.first, x.buckets[-1] + 1)]
+        x.early = dict([(x.parse(key), count) \
+                        for key, count in data.get("early", {}).items()])
+
+        if data.get("distinct") is not None:
+            x.distinct = data["distinct"]
+            x.sketches = dict([(x.parse(key), HyperLogLog.restore(sketch)) \
+                               for key, sketch in data["sketches"].items()])
+        x.build_calculations()
+
+        return x
+
+    restore = staticmethod(restore)
+
+    def fill(self, entries):
+        """
+        Counts the entries which fall in the window. Entries from before
+        the start of the window are counted aside, they belong in the
+        window of a merged graph which starts earlier.
+        """
+
+        self.early = {}
+        self.sketches = {}
+
+        counts = self.counts
+        first = self.first
+        end = len(counts)
+        seconds = self.seconds
+        window = set(self.buckets)
+
+        for entry in entries:
+
+            # Buckets of a fixed number of seconds need only a division,
+            # months and years go through the calendar
+            if seconds:
+                i = entry.timestamp // seconds - first
+            else:
+                i = self.bucket(entry.timestamp) - first
+
+            # Check to make sure the bucket is found in the window, counts
+            # of skipped months are never graphed
+            if i >= end:
+                continue
+            elif self.distinct is not None:
+                if i < 0 or first + i in window:
+                    self.add(first + i, entry)
+            elif i >= 0:
+                counts[i] += 1
+            else:
+                self.early[first + i] = self.early.get(first + i, 0) + 1
+
+        self.estimate()
+        self.build_calculations()
+
+    def follow(self, log):
+        """
+        Counts the new entries of a followed log. An entry past the end of
+        the window starts a new window of the same type, the graph which
+        holds the current window is returned.
+        """
+
+        graph = self
+
+        for entry in log:
+            bucket = graph.bucket(entry.timestamp)
+            i = bucket - graph.first
+
+            if i >= len(graph.counts):
+                graph = self.__class__([entry])
+            elif i < 0:
+                continue
+            elif graph.distinct is None:
+                graph.counts[i] += 1
+            elif bucket in graph.buckets:
+                graph.add(bucket, entry)
+
+        # Recalculate now that the counts have changed
+        graph.estimate()
+        graph.max_value = 0
+        graph.build_calculations()
+
+        return graph
+
+    def build_calculations(self):
         """Calculates and saves important graph information"""
 
-        # find max value of any key
-        for key in list(self.keys()):
-            if self[key] > self.max_value:
-                self.max_value = self[key]
+        # find max value of any bucket
+        self.max_value = max(self.values() + [self.max_value])
 
-        # find the minimum value of any key
-        self.min_value = self.max_value
-        for key in list(self.keys()):
-            if self[key] < self.min_value:
-                self.min_value = self[key]
+        # find the minimum value of any bucket
+        self.min_value = min(self.values() + [self.max_value])
 
     def display(self):
         """Common display function used by all graph subtypes"""
@@ -61,7 +370,8 @@ class GraphHash(UserDict):
         # Declarations & Variables
         global logging
         graph_height = 6
-        graph_width = len(self)
+        counts = self.values()
+        graph_width = len(counts)
         scale = float(float(self.max_value-self.min_value)/float(graph_height))
         graph_position = {}
         graph_value = {}
@@ -77,55 +387,52 @@ class GraphHash(UserDict):
             char_fill = self.tick
             char_blank = " "
 
-        # Calculate the graph min/max, so that the information is better normalized    
+        # Calculate the graph min/max, so that the information is better normalized
         graph_min_value = self.min_value
         graph_max_value = self.max_value
 
         # Find the real minimum, could very well be zero
-        graph_min_value = self.max_value
-        for key in list(self.keys()):
-            if self[key] < graph_min_value:
-                graph_min_value = self[key]
+        graph_min_value = min(counts + [self.max_value])
 
         # Check if it should be normalized
         if graph_min_value == 0:
 
             # Recalculate
             graph_min_value = self.max_value
-            for key in list(self.keys()):
-                if self[key] < graph_min_value and self[key] != 0:
-                    graph_min_value = self[key]/2
-                    print(graph_min_value)
+            for count in counts:
+                if count < graph_min_value and count != 0:
+                    graph_min_value = count/2
 
-        # Normalize data
-        for key in list(self.keys()):
-            if self[key] > 0:
+        # Normalize data, the counts are kept so the graph can be redrawn
+        heights = []
+        for count in counts:
+            if count > 0:
 
                 # Ensure difference between min/max or don't normalize
                 if graph_max_value > graph_min_value:
-                    self[key] = ceil((float(self[key]-graph_min_value)/float(graph_max_value-graph_min_value))*graph_height)
+                    count = ceil((float(count-graph_min_value)/float(graph_max_value-graph_min_value))*graph_height)
 
                 # Normalize because of difference between min/max
                 else:
-                    self[key] = ceil((float(self[key])/float(graph_max_value))*graph_height)
+                    count = ceil((float(count)/float(graph_max_value))*graph_height)
+
+            heights.append(count)
 
         # Start Graph Printing
         print()
 
-        # Print out the dictionary first sorted by the word with
-        # the most entries with an alphabetical subsort
+        # Print out the buckets from the start of the window to its end
         for i in reversed(list(range(1,graph_height))):
-            for key in sorted(self.keys()):
-                    
-                if self[key] >= i:
+            for height in heights:
+
+                if height >= i:
                     sys.stdout.write(char_fill)
                 else:
                     sys.stdout.write(char_blank)
             print()
 
         # Print line of '#' charachters at bottom of screen
-        for key in list(self.keys()):
-            sys.stdout.write(char_fill)
+        sys.stdout.write(char_fill * len(heights))
         print()
 
         # Determine numbers for normal and wide graphs
@@ -150,7 +457,7 @@ class GraphHash(UserDict):
         graph_value["middle"] = eval("self.middle_date."+self.unit)
         graph_value["end"] = eval("self.end_date."+self.unit)
 
-        # Draw numbers at bottom of the screen            
+        # Draw numbers at bottom of the screen
         for i in range(1,graph_width):
 
             # Beginning
@@ -177,366 +484,75 @@ class GraphHash(UserDict):
 class SecondsGraph(GraphHash):
     """60 second graph subtype"""
 
-    def __init__(self, log):
-
-        # Call parent init
-        UserDict.__init__(self)
-
-        # Turn first line into syslog
-        if len(log) > 0:
-            first_entry = log[0]
-        else:
-            sys.exit()
-
-        # Local Variables
-        counter = 0
-        self.second = first_entry.second
-        self.minute = first_entry.minute
-        self.hour = first_entry.hour
-        self.day = first_entry.day
-        self.month = str(first_entry.month)
-        self.year = first_entry.year
-        self.unit = "second"
-        self.duration = 60
-
-        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
-        start_key = start_date.year+start_date.month+start_date.day+start_date.hour+start_date.minute+start_date.second
-
-        # Zero out each entry, this will fill in blanks which
-        # may be in the log, especially sparse logs.
-        for i in range(0, self.duration):
-
-            # Calculate the current date, the last one will be the end date
-            end_date = start_date + datetime.timedelta(seconds=i)
-            end_key = str(end_date.year)+str("%.2d" % (end_date.month))+str("%.2d" % (end_date.day))+str("%.2d" % (end_date.hour))+str("%.2d" % (end_date.minute))+str("%.2d" % (end_date.second))
-            self.zero(end_key)
-
-            # Check for middle date and save
-            if i == (self.duration/2):
-                middle_date = end_date
-
-        # Save final values
-        self.start_date = start_date
-        self.middle_date = middle_date
-        self.end_date = end_date
-
-        # Create a dictionary with an entry for each line. Increment
-        # the value for each time the word is found. Merge lines by
-        # Removing numbers and replacing them with a single '#'
-        for entry in log:
-
-            # Create key rooted in time
-            key = entry.year+entry.month+entry.day+entry.hour+entry.minute+entry.second
-
-            # Check to make sure key is found in the list built above
-            if key in list(self.keys()):
-                self.increment(key)
-
-        self.build_calculations()
+    unit = "second"
+    duration = 60
+    seconds = 1
+    fields = 6
 
 
 class MinutesGraph(GraphHash):
     """60 minute graph subtype"""
 
-    def __init__(self, log):
-
-        # Call parent init
-        UserDict.__init__(self)
-
-        # Turn first line into syslog
-        if len(log) > 0:
-            first_entry = log[0]
-        else:
-            sys.exit()
-
-        # Local Variables
-        counter = 0
-        self.second = 0
-        self.minute = first_entry.minute
-        self.hour = first_entry.hour
-        self.day = first_entry.day
-        self.month = str(first_entry.month)
-        self.year = first_entry.year
-        self.unit = "minute"
-        self.duration = 60
-
-        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
-        start_key = start_date.year+start_date.month+start_date.day+start_date.hour+start_date.minute
-
-        # Zero out each entry, this will fill in blanks which
-        # may be in the log, especially sparse logs.
-        for i in range(0, self.duration):
-
-            # Calculate the current date, the last one will be the end date
-            end_date = start_date + datetime.timedelta(minutes=i)
-            end_key = str(end_date.year)+str("%.2d" % (end_date.month))+str("%.2d" % (end_date.day))+str("%.2d" % (end_date.hour))+str("%.2d" % (end_date.minute))
-            self.zero(end_key)
-
-            # Check for middle date and save
-            if i == (self.duration/2):
-                middle_date = end_date
-
-        # Save final values
-        self.start_date = start_date
-        self.middle_date = middle_date
-        self.end_date = end_date
-
-        # Create a dictionary with an entry for each line. Increment
-        # the value for each time the word is found. Merge lines by
-        # Removing numbers and replacing them with a single '#'
-        for entry in log:
-
-            # Create key rooted in time
-            key = entry.year+entry.month+entry.day+entry.hour+entry.minute
-
-            # Check to make sure key is found in the list built above
-            if key in list(self.keys()):
-                self.increment(key)
-
-        self.build_calculations()
+    unit = "minute"
+    duration = 60
+    seconds = 60
+    fields = 5
 
 
 class HoursGraph(GraphHash):
     """24 hour graph subtype"""
 
-    def __init__(self, log):
-
-        # Call parent init
-        UserDict.__init__(self)
-
-        # Turn first line into syslog
-        if len(log) > 0:
-            first_entry = log[0]
-        else:
-            sys.exit()
-
-        # Local Variables
-        counter = 0
-        self.second = 0
-        self.minute = 0
-        self.hour = first_entry.hour
-        self.day = first_entry.day
-        self.month = str(first_entry.month)
-        self.year = first_entry.year
-        self.unit = "hour"
-        self.duration = 24
-
-        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
-        start_key = start_date.year+start_date.month+start_date.day+start_date.hour
-
-        # Zero out each entry, this will fill in blanks which
-        # may be in the log, especially sparse logs.
-        for i in range(0, self.duration):
-
-            # Calculate the current date, the last one will be the end date
-            end_date = start_date + datetime.timedelta(hours=i)
-            end_key = str(end_date.year)+str("%.2d" % (end_date.month))+str("%.2d" % (end_date.day))+str("%.2d" % (end_date.hour))
-            self.zero(end_key)
-
-            # Check for middle date and save
-            if i == (self.duration/2):
-                middle_date = end_date
-
-        # Save final values
-        self.start_date = start_date
-        self.middle_date = middle_date
-        self.end_date = end_date
-
-        # Create a dictionary with an entry for each line. Increment
-        # the value for each time the word is found. Merge lines by
-        # Removing numbers and replacing them with a single '#'
-        for entry in log:
-
-            # Create key rooted in time
-            key = entry.year+entry.month+entry.day+entry.hour
-
-            # Check to make sure key is found in the list built above
-            if key in list(self.keys()):
-                self.increment(key)
-
-        self.build_calculations()
+    unit = "hour"
+    duration = 24
+    seconds = 3600
+    fields = 4
 
 
 class DaysGraph(GraphHash):
     """30 day graph subtype"""
 
-    def __init__(self, log):
-
-        # Call parent init
-        UserDict.__init__(self)
-
-        # Turn first line into syslog
-        if len(log) > 0:
-            first_entry = log[0]
-        else:
-            sys.exit()
-
-        # Local Variables
-        counter = 0
-        self.second = 0
-        self.minute = 0
-        self.hour = 0
-        self.day = first_entry.day
-        self.month = str(first_entry.month)
-        self.year = first_entry.year
-        self.unit = "day"
-        self.duration = 31
-
-        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
-        start_key = start_date.year+start_date.month+start_date.day
-
-        # Zero out each entry, this will fill in blanks which
-        # may be in the log, especially sparse logs.
-        for i in range(0, self.duration):
-
-            # Calculate the current date, the last one will be the end date
-            end_date = start_date + datetime.timedelta(days=i)
-            end_key = str(end_date.year)+str("%.2d" % (end_date.month))+str("%.2d" % (end_date.day))
-            self.zero(end_key)
-
-            # Check for middle date and save
-            if i == (int(self.duration/2)):
-                middle_date = end_date
-
-        # Save final values
-        self.start_date = start_date
-        self.middle_date = middle_date
-        self.end_date = end_date
-
-        # Create a dictionary with an entry for each line. Increment
-        # the value for each time the word is found. Merge lines by
-        # Removing numbers and replacing them with a single '#'
-        for entry in log:
-
-            # Create key rooted in time
-            key = entry.year+entry.month+entry.day
-
-            # Check to make sure key is found in the list built above
-            if key in list(self.keys()):
-                self.increment(key)
-
-        self.build_calculations()
+    unit = "day"
+    duration = 31
+    seconds = 86400
+    fields = 3
 
 
 class MonthsGraph(GraphHash):
     """12 month graph subtype"""
 
-    def __init__(self, log):
-
-        # Call parent init
-        UserDict.__init__(self)
-
-        # Turn first line into syslog
-        if len(log) > 0:
-            first_entry = log[0]
-        else:
-            sys.exit()
-
-        # Local Variables
-        counter = 0
-        self.second = 0
-        self.minute = 0
-        self.hour = 0
-        self.day = 1
-        self.month = str(first_entry.month)
-        self.year = first_entry.year
-        self.unit = "month"
-        self.duration = 12
-
-        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
-        start_key = start_date.year+start_date.month
-
-        # Zero out each entry, this will fill in blanks which
-        # may be in the log, especially sparse logs.
-        for i in range(0, self.duration):
-
-            # Calculate the current date, the last one will be the end date
-            end_date = start_date + datetime.timedelta(days=i*365/12 + 1)
-            end_key = str(end_date.year)+str("%.2d" % (end_date.month))
-            self.zero(end_key)
-            logging.debug("End Date: " + str(end_date))
-            logging.debug("End Key: " + end_key)
-
-            # Check for middle date and save
-            if i == (self.duration/2):
-                middle_date = end_date
-
-        # Save final values
-        self.start_date = start_date
-        self.middle_date = middle_date
-        self.end_date = end_date
-
-        # Create a dictionary with an entry for each line. Increment
-        # the value for each time the word is found. Merge lines by
-        # Removing numbers and replacing them with a single '#'
-        for entry in log:
+    unit = "month"
+    duration = 12
+    fields = 2
 
-            # Create key rooted in time
-            key = entry.year+entry.month
+    def step(self, i):
+        """Returns the time from the start of the window to its i-th bucket"""
+        return datetime.timedelta(days=i*365/12 + 1)
 
-            # Check to make sure key is found in the list built above
-            if key in list(self.keys()):
-                self.increment(key)
+    def bucket(self, timestamp):
+        """Returns the number of months from 1970 to a time stamp"""
+        fields = stamp_fields(timestamp)
+        return (int(fields[0]) - 1970) * 12 + int(fields[1]) - 1
 
-        self.build_calculations()
+    def stamp(self, bucket):
+        """Returns the time stamp at the start of a bucket"""
+        return epoch(1970 + bucket // 12, bucket % 12 + 1, 1, 0, 0, 0)
 
 
 class YearsGraph(GraphHash):
     """10 year graph subtype"""
 
-    def __init__(self, log):
-
-        # Call parent init
-        UserDict.__init__(self)
-
-        # Turn first line into syslog
-        if len(log) > 0:
-            first_entry = log[0]
-        else:
-            sys.exit()
-
-        # Local Variables
-        counter = 0
-        self.second = 0
-        self.minute = 0
-        self.hour = 0
-        self.day = 1
-        self.month = 1
-        self.year = first_entry.year
-        self.unit = "year"
-        self.duration = 10
-
-        start_date = datetime.datetime(int(self.year),int(self.month),int(self.day),int(self.hour),int(self.minute),int(self.second))
-        start_key = start_date.year
+    unit = "year"
+    duration = 10
+    fields = 1
 
-        # Zero out each entry, this will fill in blanks which
-        # may be in the log, especially sparse logs.
-        for i in range(0, self.duration):
+    def step(self, i):
+        """Returns the time from the start of the window to its i-th bucket"""
+        return datetime.timedelta(days=i*365)
 
-            # Calculate the current date, the last one will be the end date
-            end_date = start_date + datetime.timedelta(days=i*365)
-            end_key = str(end_date.year)
-            self.zero(end_key)
+    def bucket(self, timestamp):
+        """Returns the number of years from 1970 to a time stamp"""
+        return int(stamp_fields(timestamp)[0]) - 1970
 
-            # Check for middle date and save
-            if i == (self.duration/2):
-                middle_date = end_date
-
-        # Save final values
-        self.start_date = start_date
-        self.middle_date = middle_date
-        self.end_date = end_date
-
-        # Create a dictionary with an entry for each line. Increment
-        # the value for each time the word is found. Merge lines by
-        # Removing numbers and replacing them with a single '#'
-        for entry in log:
-
-            # Create key rooted in time
-            key = entry.year
-
-            # Check to make sure key is found in the list built above
-            if key in list(self.keys()):
-                self.increment(key)
-
-        self.build_calculations()
+    def stamp(self, bucket):
+        """Returns the time stamp at the start of a bucket"""
+        return epoch(1970 + bucket, 1, 1, 0, 0, 0)
@@ -1,8 +1,12 @@
 """Contains SuperHash and all closely related children"""
 
 from collections import UserDict
+from collections import Counter
 from .Filter import Filter
-from .CrunchLog import CrunchLog
+from .Filter import RuleTable
+from .FingerprintIndex import FingerprintIndex
+from .TemplateTree import TemplateTree
+from .KeyCluster import KeyCluster
 
 from .CrunchLog import SyslogEntry
 from .CrunchLog import RSyslogEntry
@@ -11,11 +15,16 @@ from .CrunchLog import ApacheErrorEntry
 from .CrunchLog import SnortEntry
 from .CrunchLog import RawEntry
 from .CrunchLog import SecureLogEntry
+from .CrunchLog import entry_state
+from .CrunchLog import load_entry
 
 import logging
 from random import choice
-import re
-import os
+from random import random
+from heapq import heapify
+from heapq import heappop
+from heapq import heappush
+from heapq import nsmallest
 import sys
 
 class SuperHash(UserDict):
@@ -24,17 +33,40 @@ class SuperHash(UserDict):
     filter = Filter()
     sample = "none"
 
+    # Entries kept for each key, the first one and a random sample of the rest
+    reservoir_size = 10
+
+    # Keys kept when counting heavy hitters, 0 keeps every key
+    counters = 0
+
+    # Keys displayed, 0 displays every key
+    top = 0
+
+    # Smallest count displayed
+    min_count = 0
+
+    # Lines of output written at a time
+    write_lines = 4096
+
     def __init__(self, log, filter_filename="__none__"):
 
         # Call parent init
         UserDict.__init__(self)
 
-        if log[0] != "__none__" and filter_filename != "__none__":
+        # Space-Saving state, counts by key with the smallest first and
+        # how much each count may be too high
+        self.heap = []
+        self.pushes = 0
+        self.errors = {}
+        self.lines = 0
+
+        if log != ["__none__"] and filter_filename != "__none__":
             # Setup log and filter
             self.filter = Filter(filter_filename)
             self.fill(log)
+            logging.info(self.filter.statistics())
 
-        elif log[0] != "__none__":
+        elif log != ["__none__"]:
             # Setup log without filter
             self.fill(log)
             
@@ -46,18 +78,161 @@ class SuperHash(UserDict):
         """Interface method which is flled in by subclasses"""
         pass
 
+    def key(self, entry):
+        """Interface method which returns the key of an entry"""
+        pass
+
     def increment(self, key, entry):
         """Adds a new entry to superhash data structures.
         Similar to append for a list"""
 
         # Check to make sure it exists
         if key not in self:
-            self[key] = [0, []]
+            if self.counters and len(self) >= self.counters:
+                self.replace_minimum(key)
+            else:
+                self[key] = [0, []]
+                if self.counters:
+                    self.push(0, key)
 
         # Increment the hashed count
-        # Create an array of un-hashed values for sampling later
-        self[key][0] += 1
-        self[key][1].append(entry)
+        self.lines += 1
+        bucket = self[key]
+        bucket[0] += 1
+        samples = bucket[1]
+
+        # Keep un-hashed values for sampling later. The first entry stays
+        # in front and the rest of the reservoir is a uniform sample of the
+        # later entries
+        if len(samples) < self.reservoir_size:
+            samples.append(entry)
+        else:
+            slot = 1 + int(random() * (bucket[0] - 1))
+            if slot < self.reservoir_size:
+                samples[slot] = entry
+
+    def replace_minimum(self, key):
+        """
+        Space-Saving step for a new key when every counter is in use. The
+        key with the smallest count is dropped and the new key takes over
+        its count, which becomes the error of the new key. This bounds the
+        error of every count to the number of lines divided by the number
+        of counters.
+        """
+
+        if len(self.heap) < 1:
+            self.build_heap()
+
+        # Counts in the heap may be stale, they are only updated here
+        while True:
+            count, order, old_key = heappop(self.heap)
+            if old_key not in self.data:
+                continue
+            elif self.data[old_key][0] != count:
+                self.push(self.data[old_key][0], old_key)
+            else:
+                break
+
+        del self.data[old_key]
+        self.errors.pop(old_key, None)
+
+        self.data[key] = [count, []]
+        self.errors[key] = count
+        self.push(count, key)
+
+    def push(self, count, key):
+        """
+        Adds the count of a key to the heap. Equal counts are ordered by
+        when they were pushed, so keys of different types such as template
+        ids and template text are never compared
+        """
+
+        self.pushes += 1
+        heappush(self.heap, (count, self.pushes, key))
+
+    def build_heap(self):
+        """Rebuilds the heap of counts from the buckets"""
+
+        if not self.counters:
+            self.heap = []
+            return
+
+        self.heap = [(self.data[key][0], i, key) \
+                     for i, key in enumerate(self.data, self.pushes + 1)]
+        self.pushes += len(self.heap)
+        heapify(self.heap)
+
+    def error_bound(self):
+        """Largest amount a count may be too high when counting heavy hitters"""
+
+        if len(self.errors) < 1:
+            return 0
+
+        return max(self.errors.values())
+
+    def merge(self, other):
+        """Adds the counts and samples of another SuperHash to this one.
+        Samples of self are kept in front so the first sample is preserved
+        when hashes are merged in log order"""
+
+        # Keys missing from a full Space-Saving hash may have had as many
+        # lines as its smallest count
+        minimum = 0
+        other_minimum = 0
+        if self.counters and len(self) >= self.counters:
+            minimum = min([self[key][0] for key in self])
+        if self.counters and len(other) >= self.counters:
+            other_minimum = min([other[key][0] for key in other])
+
+        for key in other:
+            if key in self:
+                self[key][1] = self.merge_samples(self[key], other[key])
+                self[key][0] += other[key][0]
+                self.errors[key] = self.errors.get(key, 0) + \
+                                   other.errors.get(key, 0)
+            else:
+                self[key] = [other[key][0], list(other[key][1])]
+                self[key][0] += minimum
+                self.errors[key] = other.errors.get(key, 0) + minimum
+
+        for key in self:
+            if key not in other and other_minimum > 0:
+                self[key][0] += other_minimum
+                self.errors[key] = self.errors.get(key, 0) + other_minimum
+
+        self.lines += other.lines
+
+        # Keep the keys with the largest counts
+        if self.counters and len(self) > self.counters:
+            for key in nsmallest(len(self) - self.counters, self.keys(),
+                                 key=lambda k: self[k][0]):
+                del self[key]
+                self.errors.pop(key, None)
+
+        self.build_heap()
+
+    def merge_samples(self, bucket, other):
+        """
+        Combines the reservoirs of two buckets. The first sample of bucket
+        is kept and the rest are drawn from both reservoirs, weighted by the
+        number of entries each sample stands for.
+        """
+
+        samples = bucket[1]
+        others = other[1]
+
+        if len(samples) + len(others) <= self.reservoir_size:
+            return samples + others
+
+        # Weighted sampling without replacement by random keys
+        weight = float(bucket[0] - 1) / max(1, len(samples) - 1)
+        other_weight = float(other[0]) / len(others)
+        keys = [(random() ** (1.0 / weight), sample) for sample in samples[1:]]
+        keys += [(random() ** (1.0 / other_weight), sample) for sample in others]
+        keys.sort(key=lambda k: k[0], reverse=True)
+
+        return samples[:1] + [sample for k, sample in \
+                              keys[:self.reservoir_size - 1]]
 
     def display(self):
         """Displays all entries held in the SuperHash structure"""
@@ -70,30 +245,55 @@ class SuperHash(UserDict):
         # Debugging
         logging.info("Sample Type: "+self.sample)
 
+        if self.counters:
+            logging.info("Heavy Hitters: " + str(self.lines) + " lines, " + \
+                         str(self.counters) + " counters, counts may be up" \
+                         " to " + str(self.error_bound()) + " too high")
+
         # Print out the dictionary first sorted by the word with
-        # the most entries with an alphabetical subsort
-        for key in sorted(sorted(self.keys()),
-                key=lambda k : self[k][0],
-                reverse=True):
+        # the most entries with an alphabetical subsort. Only the top
+        # entries are selected when that is all that is displayed
+        order = lambda k : (-self[k][0], k)
+        keys = self.keys()
+
+        if self.min_count > 1:
+            keys = [key for key in keys if self[key][0] >= self.min_count]
+
+        if self.top:
+            keys = nsmallest(self.top, keys, key=order)
+        else:
+            keys = sorted(keys, key=order)
+
+        if len(keys) > 0 and self.sample not in ("all", "none", "threshold"):
+            print(("That type of sampling is not supported:", self.sample))
+            sys.exit(16)
+
+        # Lines are written in blocks instead of one at a time
+        lines = []
+
+        for key in keys:
 
             # Print all lines as sample
             if self.sample == "all":
-                print((str(self[key][0]) + ":	" + \
-                choice(self[key][1]).log_entry))
+                lines.append(str(self[key][0]) + ":	" + \
+                             choice(self[key][1]).log_entry + "\n")
 
             elif self.sample == "none":
-                print((str(self[key][0]) + ":	"+str(key)))
+                lines.append(str(self[key][0]) + ":	" + str(key) + "\n")
 
             elif self.sample == "threshold":
                 # Print sample for small values below/equal to threshold
                 if self[key][0] <= sample_threshold:
-                    print((str(self[key][0]) + ":	" + \
-                    self[key][1][0].log_entry))
+                    lines.append(str(self[key][0]) + ":	" + \
+                                 self[key][1][0].log_entry + "\n")
                 else:
-                    print((str(self[key][0]) + ":	" + str(key)))
-            else:
-                print(("That type of sampling is not supported:", self.sample))
-                sys.exit(16)
+                    lines.append(str(self[key][0]) + ":	" + str(key) + "\n")
+
+            if len(lines) >= self.write_lines:
+                sys.stdout.write("".join(lines))
+                lines = []
+
+        sys.stdout.write("".join(lines))
 
     def fingerprint(self):
         """
@@ -103,81 +303,106 @@ class SuperHash(UserDict):
 
         global logging
 
-        # Declarations & Variables
-        threshold_coefficient = 0.31
-        fingerprints = []
-        fingerprint_files = ["__none__"]
-
-        # Load & assign fingerprint files
-        prefixes =  [ \
-            "/var/lib/petit/fingerprints/", \
-            "/usr/local/petit/var/lib/fingerprints/" \
-            "/opt/petit/var/lib/fingerprints/"]
-
-        for prefix in prefixes:
-            if os.path.exists(prefix) and len(os.listdir(prefix)) >= 1:
-
-                # Process in order from largest to smallest which prevents 
-                # double labeling with similar fingerprints
-                fingerprint_files = os.listdir(prefix)
-                fingerprint_files = [os.path.join(prefix, f) for f in fingerprint_files]
-                fingerprint_files.sort(key=lambda x: os.path.getsize(x))
-                fingerprint_files.reverse()
-                break
+        # Fingerprints are hashed once and kept in an index until their
+        # files change
+        index = FingerprintIndex(SuperHash.build_fingerprint)
 
-        if fingerprint_files[0] == "__none__":
-            print(("Could not locate fingerprint files: ", prefix))
-            sys.exit()
+        fingerprints = index.matchable()
+        inverted = index.inverted(fingerprints)
 
-        for fingerprint_file in fingerprint_files:
-            if re.search("fp",fingerprint_file):
+        # Score every fingerprint in one pass over the keys of the hash
+        counts = [0] * len(fingerprints)
+        for key in self.keys():
+            for i in inverted.get(key, ()):
+                counts[i] += 1
 
-                # Build a Log for the fingerprint
-                log = CrunchLog(fingerprint_file)
+        # Iterate each fingerprint, largest first. Keys removed by a found
+        # fingerprint no longer count for the ones after it
+        for i, fingerprint in enumerate(fingerprints):
 
-                # Build a SuperHash
-                x = SuperHash.manufacture(log, "hash.stopwords")
+            logging.info("Testing Fingerprint:"+fingerprint["name"])
 
-		# Remove the prefix & set name
-                x.file_name = re.sub(prefix, "", fingerprint_file)
-                fingerprints.append(x)
+            keys = fingerprint["keys"]
+            threshold = index.threshold(fingerprint)
+            logging.info("Threshold:"+str(threshold))
+            logging.info("Count: "+str(counts[i]))
+
+            # If Threshold is reached, remove everyline of fingerprint
+            if counts[i] > threshold:
+                logging.info("Found Fingerprint:"+fingerprint["name"])
+                for key in keys:
+
+                    # Key found, plenty to remove
+                    if key in self:
+                        del self[key]
+                        for j in inverted[key]:
+                            counts[j] -= 1
+
+                # Force the sample entry to be the same as the key
+                # and based off of the filename of the fingerprint
+                name = fingerprint["name"]
+                if name not in self:
+                    for j in inverted.get(name, ()):
+                        counts[j] += 1
+
+                # Found fingerprints are kept beside the counted keys, so
+                # they never take the counter of a key of the log
+                counters = self.counters
+                self.counters = 0
+                self.increment(name, index.sample(fingerprint))
+                self.counters = counters
+
+    def cluster(self, similarity=0.7):
+        """
+        Merges keys whose words are similar into the key of each cluster
+        with the most entries, adding up their counts and samples
+        """
 
+        global logging
 
-        # Iterate each fingerprint
-        for fingerprint in fingerprints:
+        keys = list(self.keys())
+        merged = 0
+
+        for positions in KeyCluster(similarity).cluster(keys):
+            if len(positions) < 2:
+                continue
+
+            members = sorted([keys[i] for i in positions], \
+                             key=lambda k: (-self[k][0], k))
+            # A new bucket is made so copies of the hash are left alone
+            bucket = [self[members[0]][0], list(self[members[0]][1])]
+            self[members[0]] = bucket
+
+            for key in members[1:]:
+                bucket[1] = self.merge_samples(bucket, self[key])
+                bucket[0] += self[key][0]
+                if key in self.errors:
+                    self.errors[members[0]] = self.errors.get(members[0], 0) \
+                                              + self.errors.pop(key)
+                del self[key]
 
-            logging.info("Testing Fingerprint:"+fingerprint.file_name)
+            merged += len(members) - 1
 
-            # Reset counter for each fingerprint
-            count = 0
-            threshold = (len(fingerprint) * threshold_coefficient)
-            logging.info("Threshold:"+str(threshold))
+        logging.info("Clustered Keys: " + str(merged) + " of " + \
+                     str(len(keys)) + " merged")
 
-            # Look for fingerpring
-            for key in list(fingerprint.keys()):
-                if key in self:
-                    count = count+1
+        self.build_heap()
 
-                # If Threshold is reached, remove everyline of fingerprint
-                # Saves time on searching every entry
-                if count > threshold:
-                    logging.info("Found Fingerprint:"+fingerprint.file_name)
-                    for key in list(fingerprint.keys()):
+    def build_fingerprint(log, filter):
+        """Builds the SuperHash of a fingerprint file with every key kept"""
 
-                        # Key found, plenty to remove
-                        if key in self:
-                            del self[key]
+        counters = SuperHash.counters
+        SuperHash.counters = 0
 
-                    # Force the sample entry to be the same as the key
-                    # and based off of the filename of the fingerprint
-                    fingerprint[key][1][0].log_entry = fingerprint.file_name
-                    self.increment(fingerprint.file_name, fingerprint[key][1][0]) 
-                    break
+        try:
+            return SuperHash.manufacture(log, filter)
+        finally:
+            SuperHash.counters = counters
 
-            logging.info("Count: "+str(count))
+    build_fingerprint = staticmethod(build_fingerprint)
 
-    def manufacture(log, filter):
-        """Factory method which creates new SuperHash of correct subtype"""
+    def subtype(log):
+        """Returns the SuperHash subclass which hashes the entries of a log"""
 
         # Select the correct build method
         if log.contains(SyslogEntry):
@@ -198,15 +423,67 @@ class SuperHash(UserDict):
             print("Could not determine what type of objects are contained in generic Log""")
             sys.exit(15)
 
+        return LogHash
+
+    subtype = staticmethod(subtype)
+
+    def manufacture(log, filter):
+        """Factory method which creates new SuperHash of correct subtype"""
+
         # Build and return the correct subclass instance based on log file type
-        return LogHash(log, filter)
+        return SuperHash.subtype(log)(log, filter)
 
     manufacture = staticmethod(manufacture)
 
+    def dump(self):
+        """
+        Returns the counts and sample entries as lists and dictionaries
+        which can be saved as JSON and loaded with restore
+        """
+
+        return {"type": self.__class__.__name__,
+                "buckets": [[key, self[key][0], \
+                             [entry_state(entry) for entry in self[key][1]]] \
+                            for key in self],
+                "errors": self.errors,
+                "lines": self.lines}
+
+    def restore(data):
+        """Factory method which rebuilds a SuperHash saved with dump"""
+
+        # Only subclasses of SuperHash can be rebuilt
+        hash_types = [SuperHash]
+        for hash_type in hash_types:
+            hash_types.extend(hash_type.__subclasses__())
+
+        for LogHash in hash_types:
+            if LogHash.__name__ == data["type"]:
+                break
+        else:
+            raise ValueError("Unknown hash type: " + str(data["type"]))
+
+        x = LogHash(["__none__"])
+        for key, count, samples in data["buckets"]:
+            x[key] = [count, [load_entry(sample) for sample in samples]]
+
+        # Heavy hitter error bounds, reports saved before they were kept
+        # have none
+        x.errors = dict(data.get("errors", {}))
+        x.lines = data.get("lines", 0)
+
+        return x
+
+    restore = staticmethod(restore)
+
 
 class SyslogHash(SuperHash):
     """Overrides the fill method specifically for LogHashes built from Syslog files"""
     
+    def key(self, entry):
+        """Returns the scrubbed key of an entry"""
+
+        return self.filter.scrub(entry.daemon+" "+entry.log_entry)
+
     def fill(self, log):
         # Create a dictionary with an entry for each line. Increment
         # the value for each time the word is found. Merge lines by
@@ -214,7 +491,7 @@ class SyslogHash(SuperHash):
         for entry in log:
 
             # Scrub sections of SyslogEntry which will be used to key the hash
-            key = self.filter.scrub(entry.daemon+" "+entry.log_entry)
+            key = self.key(entry)
 
             # increment the LogHash with the new key
             self.increment(key, entry)
@@ -226,6 +503,11 @@ class SyslogHash(SuperHash):
 class ApacheLogHash(SuperHash):
     """Overrides the fill method specifically for LogHashes built from Apache logs"""
     
+    def key(self, entry):
+        """Returns the scrubbed key of an entry"""
+
+        return self.filter.scrub(entry.log_entry)
+
     def fill(self, log):
         # Create a dictionary with an entry for each line. Increment
         # the value for each time the word is found. Merge lines by
@@ -233,7 +515,7 @@ class ApacheLogHash(SuperHash):
         for entry in log:
 
             # Scrub sections of SyslogEntry which will be used to key the hash
-            key = self.filter.scrub(entry.log_entry)
+            key = self.key(entry)
 
             # increment the LogHash with the new key
             self.increment(key, entry)
@@ -246,6 +528,11 @@ class ApacheLogHash(SuperHash):
 class SnortLogHash(SuperHash):
     """Overrides the fill method specifically for LogHashes built from Snort logs"""
     
+    def key(self, entry):
+        """Returns the scrubbed key of an entry"""
+
+        return self.filter.scrub(entry.log_entry)
+
     def fill(self, log):
         # Create a dictionary with an entry for each line. Increment
         # the value for each time the word is found. Merge lines by
@@ -253,7 +540,7 @@ class SnortLogHash(SuperHash):
         for entry in log:
 
             # Scrub sections of SyslogEntry which will be used to key the hash
-            key = self.filter.scrub(entry.log_entry)
+            key = self.key(entry)
 
             # increment the LogHash with the new key
             self.increment(key, entry)
@@ -265,38 +552,30 @@ class SnortLogHash(SuperHash):
 class SecureLogHash(SuperHash):
     """Overrides the fill method specifically for LogHashes built from Syslog files"""
     
+    # Rewrite rules for sshd and pam entries, loaded when first used
+    rules = None
+
+    def key(self, entry):
+        """
+        Returns the scrubbed key of an entry, the entry itself is kept as it
+        was for samples
+        """
+
+        # Clean up the log entries better since it is a secure log hash
+        if self.rules is None:
+            SecureLogHash.rules = RuleTable("secure.rules")
+
+        return self.filter.scrub(entry.daemon + " " + \
+                                 self.rules.apply(entry.log_entry))
+
     def fill(self, log):
         # Create a dictionary with an entry for each line. Increment
         # the value for each time the word is found. Merge lines by
         # Removing numbers and replacing them with a single '#'
         for entry in log:
 
-            # Clean up the log entry better since it is a secure log hash
-
-            ## Session Entries
-            entry.log_entry = re.sub("session closed for.*", "session closed for #", entry.log_entry)
-            entry.log_entry = re.sub("session opened for.*", "session opened for #", entry.log_entry)
-
-            ## Auth Entries
-            entry.log_entry = re.sub("Accepted publickey for.*", "Accepted publickey for #", entry.log_entry)
-            entry.log_entry = re.sub("Accepted password for.*", "Accepted password for #", entry.log_entry)
-            entry.log_entry = re.sub("Postponed publickey for.*", "Postponed publickey for #", entry.log_entry)
-            entry.log_entry = re.sub("input_userauth_request: invalid user.*", "input_userauth_request: invalid user #", entry.log_entry)
-            entry.log_entry = re.sub("Invalid user.*", "Invalid user #", entry.log_entry)
-            entry.log_entry = re.sub("reverse mapping checking getaddrinfo for.*", "reverse mapping checking getaddrinfo for #", entry.log_entry)
-            entry.log_entry = re.sub("Connection closed by.*", "Connection closed by #", entry.log_entry)
-            entry.log_entry = re.sub("Failed password for invalid user.*", "Failed password for invalid user #", entry.log_entry)
-            entry.log_entry = re.sub("Failed password for.*from.*", "Failed password for # from #", entry.log_entry)
-            entry.log_entry = re.sub("error retrieving information about user.*", "error retrieving information about user #", entry.log_entry)
-            entry.log_entry = re.sub("authentication failure.*", "authentication failure #", entry.log_entry)
-
-            ## Misc
-            entry.log_entry = re.sub("Received disconnect from.*", "Received disconnect from #", entry.log_entry)
-            entry.log_entry = re.sub("Could not reverse map address.*", "Could not reverse map address #", entry.log_entry)
-            #entry.log_entry = re.sub("", "", entry.log_entry)
-
             # Scrub sections of SyslogEntry which will be used to key the hash
-            key = self.filter.scrub(entry.daemon+" "+entry.log_entry)
+            key = self.key(entry)
 
             # increment the LogHash with the new key
             self.increment(key, entry)
@@ -309,6 +588,11 @@ class SecureLogHash(SuperHash):
 class RawLogHash(SuperHash):
     """Overrides the fill method specifically for LogHashes built from text files without date/time"""
     
+    def key(self, entry):
+        """Returns the scrubbed key of an entry"""
+
+        return self.filter.scrub(entry.log_entry)
+
     def fill(self, log):
         # Create a dictionary with an entry for each line. Increment
         # the value for each time the word is found. Merge lines by
@@ -316,7 +600,7 @@ class RawLogHash(SuperHash):
         for entry in log:
 
             # Scrub sections of SyslogEntry which will be used to key the hash
-            key = self.filter.scrub(entry.log_entry)
+            key = self.key(entry)
 
             # increment the LogHash with the new key
             self.increment(key, entry)
@@ -368,38 +652,143 @@ class HostHash(SyslogHash):
             del self["#"]
 
 
+class TemplateHash(SuperHash):
+    """
+    Overrides the fill method to key entries by message templates which are
+    learned from the log instead of by scrubbed lines alone
+    """
+
+    # Templates learned so far and the text each one was last keyed by
+    tree = None
+    names = None
+
+    def fill(self, log):
+
+        # Lines are scrubbed the same way as in the hash of the log type
+        # before their template is found
+        if self.tree is None:
+            self.tree = TemplateTree()
+            self.names = {}
+        hasher = SuperHash.subtype(log)(["__none__"])
+        hasher.filter = self.filter
+
+        # Templates change as they learn, so entries are counted by the id
+        # of their template and keyed by its text at the end
+        for entry in log:
+            self.increment(self.tree.add(hasher.key(entry)), entry)
+
+        self.rekey()
+
+        # Finally, remove valueless lines
+        if "#" in self:    
+            del self["#"]
+
+    def merge(self, other):
+        """
+        Adds the counts of another TemplateHash, then learns every key as a
+        line of one tree, so templates which were split between the parts
+        of a log join as they would have in a single pass
+        """
+
+        if self.tree is None:
+            self.tree = TemplateTree()
+            self.names = {}
+
+        SuperHash.merge(self, other)
+
+        # Keys are counted by the id of their template until all of them
+        # have been learned, as the templates widen while they learn
+        for key in [key for key in self.data if not isinstance(key, int)]:
+            self.fold(key, self.tree.add(key))
+
+        self.rekey()
+
+        if "#" in self:
+            del self["#"]
+
+    def rekey(self):
+        """Keys the bucket of each template by its current text"""
+
+        ids = set([key for key in self.data if isinstance(key, int)])
+
+        for i in ids | set(self.names):
+            name = self.tree.template(i)
+
+            # Counts under an id or an older text of the template
+            for old in (i, self.names.get(i)):
+                if old is not None and old != name and old in self.data:
+                    self.fold(old, name)
+
+            self.names[i] = name
+
+        # Counts are only kept in the heap under their new keys
+        self.build_heap()
+
+    def fold(self, old, name):
+        """Moves the bucket of one key into the bucket of another"""
+
+        bucket = self.data.pop(old)
+        error = self.errors.pop(old, 0)
+
+        if name in self.data:
+            self.data[name][1] = self.merge_samples(self.data[name], bucket)
+            self.data[name][0] += bucket[0]
+        else:
+            self.data[name] = bucket
+
+        if error:
+            self.errors[name] = self.errors.get(name, 0) + error
+
+
 class WordHash(SuperHash):
     """
     Subclass which creates a dictionary of words which may hold value in a given log file
     Date, time, and other common words are excluded from the count.
     """
 
+    # Lines counted before their words are scrubbed
+    chunk_lines = 10000
+
     def fill(self, log): 
 
-        # Create a dictionary with an entry for each word. Increment
-        # the value for each time the word is found
+        # Count the words of a chunk of lines first, so each distinct word
+        # is only scrubbed once per chunk and memory is bounded by the
+        # number of scrubbed keys
+        words = Counter()
+        lines = 0
+
         for entry in log:
     
             # Base the wordcount on the log_entry payload
-            for word in entry.log_entry.split():
+            words.update(entry.log_entry.split())
+            lines += 1
 
-                # increment the WordHash with the new key
-                self.increment(word, word)
+            if lines >= self.chunk_lines:
+                self.bleach(words)
+                words.clear()
+                lines = 0
 
+        self.bleach(words)
 
-        # Perform bleach at the end because it is more efficient
-        for key in list(self.keys()):
+    def bleach(self, words):
+        """Adds counts of words to the hash by the key they scrub to"""
 
-            # First scrub any unwanted words
-            newkey = self.filter.scrub(key)
-            if newkey in self:
-                self[newkey] = self[newkey] + self[key]
-            else:
-                self[newkey] = self[key]
+        for word, count in words.items():
 
-            if newkey != key:
-                del self[key]
+            # First scrub any unwanted words, valueless words are dropped
+            key = self.filter.scrub(word)
+            if key == "#":
+                continue
 
-        # Finally, remove valueless lines
-        if "#" in self:    
-            del self["#"]
+            # Words are counted without samples
+            if key in self.data:
+                self.data[key][0] += count
+            elif self.counters and len(self) >= self.counters:
+                self.replace_minimum(key)
+                self.data[key][0] += count
+            else:
+                self.data[key] = [count, []]
+                if self.counters:
+                    self.push(count, key)
+
+            self.lines += count
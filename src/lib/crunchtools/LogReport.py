@@ -0,0 +1,102 @@
+"""
+Saves hashes and graphs as compact JSON so that partial results built on
+different cores, files or hosts can be merged into one report later. A
+saved report holds the counts and sample entries of a SuperHash, or the
+window and counts of a GraphHash.
+"""
+
+from .LogHash import SuperHash
+from .LogGraph import GraphHash
+
+import json
+import sys
+import logging
+
+
+# Written at the top of every saved report
+report_format = "petit-report"
+report_version = 1
+
+
+def save(report, filename):
+    """Writes a SuperHash or GraphHash to a file"""
+
+    if isinstance(report, GraphHash):
+        kind = "graph"
+    else:
+        kind = "hash"
+
+    data = {"format": report_format,
+            "version": report_version,
+            "kind": kind,
+            "report": report.dump()}
+
+    try:
+        f = open(filename, "w")
+        json.dump(data, f, separators=(",", ":"))
+        f.write("\n")
+        f.close()
+    except (IOError, OSError):
+        print("Could not write report: " + filename)
+        sys.exit(16)
+
+
+def load(filename):
+    """Reads a SuperHash or GraphHash written by save"""
+
+    try:
+        f = open(filename)
+        data = json.load(f)
+        f.close()
+
+        if data.get("format") != report_format or \
+           data.get("version") != report_version:
+            raise ValueError("Unsupported format")
+
+        if data["kind"] == "graph":
+            return GraphHash.restore(data["report"])
+        else:
+            return SuperHash.restore(data["report"])
+
+    except (IOError, OSError):
+        print("Could not read report: " + filename)
+        sys.exit(16)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        print("Not a saved petit report: " + filename)
+        sys.exit(16)
+
+
+def describe(report):
+    """Names the type of a report for messages"""
+
+    if getattr(report, "distinct", None) is not None:
+        return report.__class__.__name__ + " of distinct " + report.distinct
+    else:
+        return report.__class__.__name__
+
+
+def reduce(filenames):
+    """
+    Loads and merges saved reports in the order given. Graphs can only be
+    merged with graphs of the same type and hashes with hashes.
+    """
+
+    result = None
+
+    for filename in filenames:
+        logging.info("Merging Report: " + filename)
+        report = load(filename)
+
+        if result is None:
+            result = report
+        elif isinstance(result, GraphHash) != isinstance(report, GraphHash) \
+             or (isinstance(result, GraphHash) and \
+                 (result.__class__ != report.__class__ or \
+                  result.distinct != report.distinct)):
+            print("Cannot merge " + describe(report) + " with " + \
+                  describe(result) + ": " + filename)
+            sys.exit(16)
+        else:
+            result.merge(report)
+
+    return result
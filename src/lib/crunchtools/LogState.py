@@ -0,0 +1,337 @@
+"""
+Saves the progress of a hash between runs so that growing log files are only
+parsed from where the last run stopped. Each file read is recorded by its
+inode, the offset where reading stopped and checksums of its first line and
+of the last line read. The counts and samples of the hash are kept with the
+file records and the newly appended lines are merged into them. Each set of
+files named on the command line keeps its own state.
+"""
+
+from .CrunchLog import CrunchLog
+from .CrunchLog import open_binary
+from .CrunchLog import compressed
+from .CrunchLog import drivers
+from .LogHash import SuperHash
+
+import os
+import sys
+import zlib
+import json
+import logging
+
+
+class LogState:
+    """Offsets of the files read and the hash built from them"""
+
+    # Lines longer than this are only checksummed up to this length
+    checksum_size = 4096
+    version = 2
+
+    def __init__(self, directory, name, filenames):
+
+        # The state of each set of files is named by a checksum of their
+        # paths, so runs against other files do not drop its records
+        paths = "\n".join(sorted([os.path.abspath(filename) \
+                                   for filename in filenames]))
+        self.path = os.path.join(directory, name + "-" + \
+                                 "%08x" % zlib.crc32(paths.encode("utf-8")) + \
+                                 ".state")
+        self.files = []
+        self.hash = None
+
+        # Driver of the lines read so far, appended lines are too few to
+        # detect it again
+        self.entry_type = None
+
+        # Records which were found in this run, the rest are dropped
+        self.seen = []
+
+        try:
+            f = open(self.path)
+            state = json.load(f)
+            f.close()
+        except IOError:
+            return
+        except ValueError:
+            print("Could not read state file: " + self.path)
+            sys.exit(16)
+
+        if not isinstance(state, dict) or \
+           state.get("version") != self.version:
+            print("Unsupported state file version: " + self.path)
+            sys.exit(16)
+
+        try:
+            self.files = state["files"]
+            for record in self.files:
+                record["inode"] = tuple(record["inode"])
+
+            if state["entry_type"] is not None:
+                self.entry_type = drivers[state["entry_type"]]
+
+            # The hash is rebuilt without its filter
+            if state["hash"] is not None:
+                self.hash = SuperHash.restore(state["hash"])
+
+        except (KeyError, TypeError, ValueError, AttributeError):
+            print("Could not read state file: " + self.path)
+            sys.exit(16)
+
+    def first_line(self, filename):
+        """Checksums the first line of a file, None for an empty file"""
+
+        f = open_binary(filename)
+        line = f.readline(self.checksum_size)
+        f.close()
+
+        if len(line) < 1:
+            return None
+
+        return zlib.crc32(line)
+
+    def last_line(self, filename, end):
+        """Returns the length and checksum of the line ending at end"""
+
+        f = open(filename, "rb")
+        start = max(0, end - self.checksum_size)
+        f.seek(start)
+        data = f.read(end - start)
+        f.close()
+
+        # Drop the newline of the previous line and everything before it
+        line = data[data.rfind(b"\n", 0, len(data) - 1) + 1:]
+
+        return len(line), zlib.crc32(line)
+
+    def last_newline(self, filename, start, size):
+        """Returns the offset after the last complete line past start"""
+
+        f = open(filename, "rb")
+        end = size
+
+        while end > start:
+            position = max(start, end - 65536)
+            f.seek(position)
+            data = f.read(end - position)
+
+            newline = data.rfind(b"\n")
+            if newline >= 0:
+                f.close()
+                return position + newline + 1
+
+            end = position
+
+        f.close()
+        return start
+
+    def verify(self, filename, record):
+        """Determines if a file still holds the lines read up to the offset"""
+
+        offset = record["offset"]
+        length = record["length"]
+
+        if record["last"] is None:
+            return True
+
+        # Compressed files are checked after decompressing up to the offset
+        if not compressed(filename) and os.path.getsize(filename) < offset:
+            return False
+
+        f = open_binary(filename)
+        f.seek(offset - length)
+        line = f.read(length)
+        f.close()
+
+        return zlib.crc32(line) == record["last"]
+
+    def find(self, filename, status, first):
+        """
+        Finds the record for a file, first by inode and then by the checksum
+        of its first line, which follows the lines of a log through rotation
+        and compression
+        """
+
+        candidates = [record for record in self.files \
+                      if record["first"] == first and record not in self.seen]
+
+        for record in candidates:
+            if record["inode"] == (status.st_dev, status.st_ino):
+                return record
+
+        if len(candidates) >= 1:
+            return candidates[0]
+
+        return None
+
+    def read(self, filename, status, first, record):
+        """Returns the span of a file which has not been read yet"""
+
+        is_compressed = compressed(filename)
+
+        # Records of compressed files cover the whole file
+        if record is not None and record["offset"] is None:
+            start = None
+        elif record is not None and self.verify(filename, record):
+            start = record["offset"]
+        else:
+            if record is not None:
+                logging.info("File was rewritten, reading it again: " + \
+                             filename)
+            start = 0
+
+        new = {"path": os.path.abspath(filename),
+               "inode": (status.st_dev, status.st_ino),
+               "first": first,
+               "compressed": is_compressed,
+               "offset": None,
+               "length": 0,
+               "last": None}
+
+        if start is None:
+            span = None
+        elif is_compressed:
+            span = (start, None)
+        else:
+            end = self.last_newline(filename, start, status.st_size)
+
+            # Incomplete last lines are left for the next run
+            if end > 0:
+                new["offset"] = end
+                new["length"], new["last"] = self.last_line(filename, end)
+            else:
+                new["offset"] = 0
+
+            span = (start, end) if end > start else None
+
+        self.seen.append(record)
+        self.records.append(new)
+
+        return span
+
+    def spans(self, filenames):
+        """
+        Returns the file names and byte spans of all lines which were not
+        read by an earlier run. When a file was rotated away the rest of it
+        is read from its new name.
+        """
+
+        spans = []
+        self.records = []
+        paths = [os.path.abspath(filename) for filename in filenames]
+        inodes = []
+
+        for filename in filenames:
+            status = os.stat(filename)
+            inodes.append((status.st_dev, status.st_ino))
+            first = self.first_line(filename)
+
+            # Empty files have nothing to identify them by yet
+            if first is None:
+                continue
+
+            record = self.find(filename, status, first)
+            span = self.read(filename, status, first, record)
+
+            if span is not None:
+                spans.append((filename, span))
+
+        # Files which were replaced under their name by log rotation
+        for record in self.files:
+            if record in self.seen or record["path"] not in paths or \
+               record["inode"] in inodes or record["offset"] is None:
+                continue
+
+            rotated = self.rotated(record)
+            if rotated is None:
+                logging.warning("Rotated file not found, skipping the rest" \
+                                " of: " + record["path"])
+                continue
+
+            status = os.stat(rotated)
+            if not self.verify(rotated, record):
+                logging.warning("Rotated file was rewritten, skipping the" \
+                                " rest of: " + rotated)
+                continue
+
+            logging.info("Reading the rest of rotated file: " + rotated)
+            span = self.read(rotated, status, record["first"], record)
+            if span is not None:
+                spans.insert(0, (rotated, span))
+
+        return spans
+
+    def rotated(self, record):
+        """Looks for the file of a record next to its old name by inode"""
+
+        directory = os.path.dirname(record["path"])
+
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            try:
+                status = os.stat(path)
+            except OSError:
+                continue
+
+            if (status.st_dev, status.st_ino) == record["inode"] and \
+               os.path.isfile(path) and not compressed(path):
+                return path
+
+        return None
+
+    def build(self, filenames, builder, *args):
+        """
+        Calls builder(log, *args) for the unread lines of each file and
+        merges the results into the saved hash, which is returned
+        """
+
+        for filename, span in self.spans(filenames):
+            logging.info("Reading " + filename + " from " + str(span))
+            log = CrunchLog(filename, stream=True, span=span, \
+                            entry_type=self.entry_type, optional=True)
+
+            if log.Entry is None:
+                continue
+
+            # Every file of the set is read with the driver of the first
+            self.entry_type = log.Entry
+
+            partial = builder(log, *args)
+            if self.hash is None:
+                self.hash = partial
+            elif self.hash.__class__ != partial.__class__:
+                print("Cannot merge " + partial.__class__.__name__ + \
+                      " with " + self.hash.__class__.__name__ + ": " + \
+                      filename)
+                sys.exit(16)
+            else:
+                self.hash.merge(partial)
+
+        return self.hash
+
+    def save(self):
+        """Writes the file records and hash to the state file"""
+
+        state = {"version": self.version,
+                 "files": self.records,
+                 "entry_type": None,
+                 "hash": None}
+
+        if self.entry_type is not None:
+            state["entry_type"] = self.entry_type.__name__
+
+        if self.hash is not None:
+            state["hash"] = self.hash.dump()
+
+        try:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+
+            f = open(self.path + ".tmp", "w")
+            json.dump(state, f, separators=(",", ":"))
+            f.write("\n")
+            f.close()
+            os.rename(self.path + ".tmp", self.path)
+
+        except (IOError, OSError):
+            print("Could not write state file: " + self.path)
+            sys.exit(16)
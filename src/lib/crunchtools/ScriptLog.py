@@ -2,11 +2,11 @@
 
 from collections import UserList
 from .CrunchLog import ScriptlogEntry
+from .CrunchLog import open_log
 import re
 import sys
 import os
 import logging
-import gzip
 import sha
 import random
 import syslog
@@ -65,11 +65,8 @@ class ScriptLog(UserList):
                     # Open the file
                     logging.debug("Opening File: "+dirname+"/"+file)
 
-                    # Check for zip file
-                    if re.search("gz", file):
-                        f = gzip.open(dirname+"/"+file)
-                    else:
-                        f = open(dirname+"/"+file)
+                    # Compressed files are detected by their magic bytes
+                    f = open_log(dirname+"/"+file)
 
                     # Read entire contents into array for speed
                     for line in f.readlines():
@@ -0,0 +1,121 @@
+"""
+Learns message templates from log lines as they are read, in the manner of
+the Drain log parser. Lines are routed through a tree of fixed depth by
+their number of tokens and their leading tokens, then compared only with
+the few templates at the leaf they reach. Tokens which differ between
+lines of the same template are replaced by the scrub character, so the
+time spent on each line does not grow with the size of the log.
+"""
+
+import re
+
+
+class TemplateTree:
+    """Parse tree of token count and leading tokens with templates at leaves"""
+
+    # Leading tokens used to route a line, the depth of the tree less two
+    depth = 4
+
+    # Share of tokens a line must have in common with a template to join it
+    similarity = 0.4
+
+    # Children of a node, later tokens are routed to the wildcard child
+    max_children = 100
+
+    wildcard = "#"
+
+    # Tokens holding digits are variable and are not used to route lines
+    variable = re.compile("[0-9#]")
+
+    # Lines remembered with the template they joined
+    cache_size = 100000
+
+    def __init__(self):
+
+        # Token count, then leading tokens, then a list of template ids
+        self.root = {}
+
+        # Tokens of each template by id
+        self.templates = []
+
+        # A line which was seen before keeps its template, which has already
+        # been widened to match it
+        self.cache = {}
+
+    def add(self, line):
+        """Adds a line to the best matching template and returns its id"""
+
+        i = self.cache.get(line)
+        if i is not None:
+            return i
+
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+
+        i = self.match(line.split())
+        self.cache[line] = i
+
+        return i
+
+    def match(self, tokens):
+        """Finds or creates the template of the tokens of a line"""
+
+        leaf = self.leaf(tokens)
+
+        best = None
+        best_score = (-1, -1)
+
+        for i in leaf:
+            template = self.templates[i]
+            same = 0
+            wildcards = 0
+
+            for a, b in zip(template, tokens):
+                if a == b:
+                    same += 1
+                if a == self.wildcard:
+                    wildcards += 1
+
+            # Lines without tokens all share one template
+            if len(tokens) > 0:
+                score = (float(same) / len(tokens), wildcards)
+            else:
+                score = (1.0, 0)
+
+            if score > best_score:
+                best, best_score = i, score
+
+        if best is not None and best_score[0] >= self.similarity:
+            template = self.templates[best]
+            for j in range(len(tokens)):
+                if template[j] != tokens[j]:
+                    template[j] = self.wildcard
+            return best
+
+        self.templates.append(tokens)
+        leaf.append(len(self.templates) - 1)
+
+        return len(self.templates) - 1
+
+    def leaf(self, tokens):
+        """Returns the list of template ids at the leaf a line is routed to"""
+
+        node = self.root.setdefault(len(tokens), {})
+
+        for token in tokens[:self.depth - 2]:
+            if self.variable.search(token):
+                token = self.wildcard
+
+            if token not in node:
+                if len(node) >= self.max_children:
+                    token = self.wildcard
+                node = node.setdefault(token, {})
+            else:
+                node = node[token]
+
+        return node.setdefault(None, [])
+
+    def template(self, i):
+        """Returns the text of a template"""
+
+        return " ".join(self.templates[i])
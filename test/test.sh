@@ -83,3 +83,315 @@ do
 		fi
 	done
 done
+
+# Option tests, each option is checked on a data file it changes the
+# output of
+update=$1
+
+golden() {
+	name=$1
+	shift
+
+	# Update files?
+	if [ "$update" == "update" ]
+	then
+		echo "Updating: petit $*: "
+		petit "$@" > output/${name}.output
+	fi
+
+	# Run test
+	echo -n "Testing: petit $*: "
+	petit "$@" > ${name}.tmp
+
+	if ! diff output/${name}.output ${name}.tmp
+	then
+		echo " Failed"
+		# Leave data in place to inspect on failure #
+		exit 1
+	else
+		rm ${name}.tmp
+		echo " Passed"
+	fi
+}
+
+# Heavy hitters, counting every key of test05 keeps the fingerprints the
+# same as without --top
+golden test06-hash-top5 --hash --top 5 data/test06.log
+golden test06-hash-top5-counters100 --hash --top 5 --counters 100 data/test06.log
+golden test05-hash-fingerprint --hash --top 400 --counters 306 --fingerprint data/test05.log
+
+# Distinct values, apache logs have a host per client and rsyslog logs a
+# daemon per program
+golden test03-hgraph-distinct-host --hgraph --distinct host data/test03.log
+golden test03-hgraph-distinct-key --hgraph --distinct key data/test03.log
+golden test10-sgraph-distinct-daemon --sgraph --distinct daemon data/test10.log
+
+# Smallest count and most common keys of other reports
+golden test09-hash-mincount10 --hash --min-count 10 data/test09.log
+golden test03-wordcount-top5 --wordcount --top 5 data/test03.log
+golden test10-daemon-mincount20-top3 --daemon --min-count 20 --top 3 data/test10.log
+
+# Fingerprints found over time, a smaller window only spans the keys
+# logged close together
+golden test15-timeline --timeline data/test15.log
+golden test15-timeline-window2 --timeline --window 2 data/test15.log
+
+# Clusters of near duplicate keys, a lower similarity merges more keys
+golden test09-hash-cluster --hash --cluster data/test09.log
+golden test09-hash-cluster-similarity50 --hash --cluster --similarity 0.5 data/test09.log
+golden test06-hash-cluster --hash --cluster data/test06.log
+
+# Fingerprint index tests, the index is compiled on the first run and when
+# it no longer matches the fingerprint files, and fingerprints are scored
+# through it the same way either way
+cache=`pwd`/index-cache
+rm -rf index-cache
+
+index() {
+	description=$1
+	compiled=$2
+
+	for test in test05 test06
+	do
+		echo -n "Testing: petit --hash --fingerprint $test.log $description: "
+		XDG_CACHE_HOME=$cache petit -v --hash --fingerprint data/${test}.log 2> ${test}-index.log > ${test}-index.tmp
+
+		if ! diff output/${test}-hash-fingerprint.output ${test}-index.tmp
+		then
+			echo " Failed"
+			exit 1
+		elif [ `grep -c "Compiling Fingerprints" ${test}-index.log` != "$compiled" ]
+		then
+			echo " Failed: expected $compiled compiles"
+			exit 1
+		else
+			rm ${test}-index.tmp ${test}-index.log
+			echo " Passed"
+		fi
+
+		# Only the first run of a set compiles the index
+		compiled=0
+	done
+}
+
+index "with no index" 1
+index "with an index" 0
+
+# A fingerprint file which is not in the index anymore
+sed -i 's/"sources":\[\["/"sources":[["removed/' index-cache/petit/fingerprints.index
+index "with a changed fingerprint file" 1
+
+echo "{" > index-cache/petit/fingerprints.index
+index "with a broken index" 1
+
+# Scoring, rhel5-reboot.fp is matched by more than 31% of its 337 keys.
+# The first 120 lines of it hold 101 of them and the first 125 hold 106
+fingerprint=/var/lib/petit/fingerprints/rhel5-reboot.fp
+
+for part in 120:0 125:1
+do
+	lines=${part%:*}
+	head -n $lines $fingerprint > rhel5-part.log
+
+	echo -n "Testing: petit --hash --fingerprint with $lines lines of rhel5-reboot.fp: "
+	found=`XDG_CACHE_HOME=$cache petit --hash --fingerprint rhel5-part.log | grep -c "rhel5-reboot.fp$"`
+	rm rhel5-part.log
+
+	if [ "$found" != "${part#*:}" ]
+	then
+		echo " Failed"
+		exit 1
+	else
+		echo " Passed"
+	fi
+done
+
+rm -rf index-cache
+
+# Options a function can not use, petit should exit with an error instead
+# of ignoring them
+for options in "--wordcount --jobs 3" "--wordcount --save unsupported.json" \
+               "--wordcount --merge" "--wordcount --state unsupported" \
+               "--timeline --jobs 3" "--sgraph --state unsupported"
+do
+	echo -n "Testing: petit $options: "
+	petit $options data/test03.log > /dev/null
+
+	if [ $? != 16 ]
+	then
+		echo " Failed"
+		exit 1
+	else
+		echo " Passed"
+	fi
+done
+
+# Detection tests, a secure log with lines from other daemons is still
+# read as a secure log
+
+echo -n "Testing: petit detects test14.log as a secure log: "
+if ! petit -v --hash data/test14.log 2>&1 >/dev/null | grep -q SecureLogEntry
+then
+	echo " Failed"
+	exit 1
+else
+	echo " Passed"
+fi
+
+# Execution path tests, each path should give the same output as reading
+# the file once with the plain function
+
+compare() {
+	description=$1
+	expected=$2
+	result=$3
+
+	echo -n "Testing: $description: "
+
+	if ! diff $expected $result
+	then
+		echo " Failed"
+		# Leave data in place to inspect on failure #
+		exit 1
+	else
+		rm $result
+		echo " Passed"
+	fi
+}
+
+functions="hash sgraph"
+
+for function in $functions
+do
+	for test in `ls data/*.log`
+	do
+		# Get the right name for the test
+		test=`basename $test | cut -f1 -d"."`
+
+		# Empty files have no output to compare
+		if [ ! -s data/${test}.log ]
+		then
+			continue
+		fi
+
+		petit --${function} data/${test}.log > ${test}-${function}-plain.tmp
+
+		# Split into processes
+		petit --${function} --jobs 3 data/${test}.log > ${test}-${function}-jobs.tmp
+		compare "petit --$function --jobs 3 $test.log" ${test}-${function}-plain.tmp ${test}-${function}-jobs.tmp
+
+		# Memory mapped
+		petit --${function} --mmap data/${test}.log > ${test}-${function}-mmap.tmp
+		compare "petit --$function --mmap $test.log" ${test}-${function}-plain.tmp ${test}-${function}-mmap.tmp
+
+		petit --${function} --mmap --jobs 3 data/${test}.log > ${test}-${function}-mmap-jobs.tmp
+		compare "petit --$function --mmap --jobs 3 $test.log" ${test}-${function}-plain.tmp ${test}-${function}-mmap-jobs.tmp
+
+		# Compressed
+		gzip -c data/${test}.log > ${test}.log.gz
+		petit --${function} ${test}.log.gz > ${test}-${function}-gzip.tmp
+		rm ${test}.log.gz
+		compare "petit --$function $test.log.gz" ${test}-${function}-plain.tmp ${test}-${function}-gzip.tmp
+
+		# Saved and merged back
+		petit --${function} --save ${test}.json data/${test}.log
+		petit --${function} --merge ${test}.json > ${test}-${function}-merge.tmp
+		rm ${test}.json
+		compare "petit --$function --save/--merge $test.log" ${test}-${function}-plain.tmp ${test}-${function}-merge.tmp
+
+		# The samples are not in time order, so a graph of two halves
+		# starts at a different entry. Only hashes are split up
+		if [ "$function" == "hash" ]
+		then
+			lines=`wc -l < data/${test}.log`
+			head -n $((lines / 2)) data/${test}.log > ${test}-first.log
+			tail -n +$((lines / 2 + 1)) data/${test}.log > ${test}-second.log
+
+			# Two files
+			petit --${function} ${test}-first.log ${test}-second.log > ${test}-${function}-files.tmp
+			compare "petit --$function $test.log in two files" ${test}-${function}-plain.tmp ${test}-${function}-files.tmp
+
+			# Two saved halves
+			petit --${function} --save ${test}-first.json ${test}-first.log
+			petit --${function} --save ${test}-second.json ${test}-second.log
+			petit --${function} --merge ${test}-first.json ${test}-second.json > ${test}-${function}-merges.tmp
+			rm ${test}-first.json ${test}-second.json
+			compare "petit --$function --save/--merge $test.log in two files" ${test}-${function}-plain.tmp ${test}-${function}-merges.tmp
+
+			# Appended to between runs
+			rm -rf ${test}-state
+			cp ${test}-first.log ${test}-growing.log
+			petit --${function} --state ${test}-state ${test}-growing.log > /dev/null
+			cat ${test}-second.log >> ${test}-growing.log
+			petit --${function} --state ${test}-state ${test}-growing.log > ${test}-${function}-state.tmp
+			rm -rf ${test}-state ${test}-growing.log
+			compare "petit --$function --state $test.log" ${test}-${function}-plain.tmp ${test}-${function}-state.tmp
+
+			rm ${test}-first.log ${test}-second.log
+		fi
+
+		rm ${test}-${function}-plain.tmp
+	done
+done
+
+# Templates learned from parts of a log are learned again by one tree when
+# the parts are merged, so they match the templates of a single pass
+function="templates"
+
+for test in test08 test14
+do
+	petit --${function} data/${test}.log > ${test}-${function}-plain.tmp
+
+	petit --${function} --jobs 3 data/${test}.log > ${test}-${function}-jobs.tmp
+	compare "petit --$function --jobs 3 $test.log" ${test}-${function}-plain.tmp ${test}-${function}-jobs.tmp
+
+	lines=`wc -l < data/${test}.log`
+	head -n $((lines / 2)) data/${test}.log > ${test}-first.log
+	tail -n +$((lines / 2 + 1)) data/${test}.log > ${test}-second.log
+	petit --${function} --save ${test}-first.json ${test}-first.log
+	petit --${function} --save ${test}-second.json ${test}-second.log
+	petit --${function} --merge ${test}-first.json ${test}-second.json > ${test}-${function}-merges.tmp
+	rm ${test}-first.json ${test}-second.json ${test}-first.log ${test}-second.log
+	compare "petit --$function --save/--merge $test.log in two files" ${test}-${function}-plain.tmp ${test}-${function}-merges.tmp
+
+	rm ${test}-${function}-plain.tmp
+done
+
+# Followed while the rest of the file is appended, the last redraw should
+# match a single pass. Fingerprints and clusters are only found on a copy
+# of the followed hash
+test="test05"
+options="--fingerprint --cluster"
+
+petit --hash ${options} data/${test}.log > ${test}-follow-plain.tmp
+
+lines=`wc -l < data/${test}.log`
+head -n $((lines / 2)) data/${test}.log > ${test}-growing.log
+petit --hash ${options} --follow --interval 1 ${test}-growing.log > ${test}-follow.out &
+pid=$!
+sleep 2
+tail -n +$((lines / 2 + 1)) data/${test}.log >> ${test}-growing.log
+sleep 3
+kill $pid
+wait $pid
+tail -n `wc -l < ${test}-follow-plain.tmp` ${test}-follow.out > ${test}-follow.tmp
+rm ${test}-growing.log ${test}-follow.out
+compare "petit --hash $options --follow $test.log" ${test}-follow-plain.tmp ${test}-follow.tmp
+rm ${test}-follow-plain.tmp
+
+# A cache of filtered lines which only holds a few lines of test06, and one
+# which holds every line, should give the same keys as no cache
+test="test06"
+
+for function in hash wordcount
+do
+	petit --${function} --scrub-cache 0 data/${test}.log > ${test}-${function}-uncached.tmp
+
+	for size in 0.01 16
+	do
+		petit --${function} --scrub-cache ${size} data/${test}.log > ${test}-${function}-cache.tmp
+		compare "petit --$function --scrub-cache $size $test.log" ${test}-${function}-uncached.tmp ${test}-${function}-cache.tmp
+	done
+
+	rm ${test}-${function}-uncached.tmp
+done